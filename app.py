@@ -4,479 +4,3888 @@ Run: python app.py or start.bat
 Click: http://localhost:8000
 """
 
+from __future__ import annotations  # Hints like pd.DataFrame stay unevaluated, so they don't import pandas
+
+import time
+
+_import_started = time.perf_counter()  # Startup timings on /health are measured from here
+
 import os
-import pandas as pd
+import asyncio
+import functools
+import hashlib
+import json
+import sqlite3
+import importlib
+import importlib.util
 import webbrowser
 import threading
 import shutil
+import uuid
 from datetime import datetime
 from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.requests import Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from typing import List, Dict, Any
-import uvicorn
-import pdfplumber
+from typing import List, Dict, Any, Optional
 import io
+import random
+import itertools
+import contextlib
+import csv
+import struct
+import zlib
+import zipfile
+import re
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    import fcntl  # POSIX only - without it builds are serialized within a single server process
+except ImportError:
+    fcntl = None
+
+# Startup: "warm" serves at once and imports the data libraries, compiles templates and starts the
+# worker pool in the background; "lazy" leaves all of that to first use; "eager" finishes it before serving
+STARTUP_MODE = os.environ.get("AUTODW_STARTUP", "warm")
+_startup = {"mode": STARTUP_MODE, "import_seconds": None, "ready_seconds": None, "warmup_seconds": None,
+            "imports": {}}
+
+# Heavy data libraries, imported on first use instead of at module import
+LAZY_MODULES = {"np": "numpy", "pd": "pandas", "pdfplumber": "pdfplumber"}
+
+class LazyModule:
+    """Stands in for a deferred library under its module-level name until it is first used"""
+
+    def __init__(self, alias: str):
+        self._alias = alias
+
+    def __getattr__(self, attr):
+        return getattr(load_module(self._alias), attr)
+
+def load_module(alias: str):
+    """Import a deferred library and bind it in place of its LazyModule, so later lookups go straight to it"""
+    module = globals()[alias]
+    if isinstance(module, LazyModule):
+        started = time.perf_counter()
+        module = importlib.import_module(LAZY_MODULES[alias])
+        globals()[alias] = module
+        _startup["imports"].setdefault(LAZY_MODULES[alias], round(time.perf_counter() - started, 3))
+    return module
+
+np = LazyModule("np")
+pd = LazyModule("pd")
+pdfplumber = LazyModule("pdfplumber")
+
+# Per-file stats cache for /files, keyed on name and validated against (size, mtime)
+FILES_CACHE_SIZE = 10_000  # LRU bound on cached upload stats
+_files_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_files_pending = set()  # Files whose exact stats are being computed in the background
+
+# Upload streaming settings
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Read/write uploads 1 MB at a time
+BATCH_UPLOAD_CONCURRENCY = int(os.environ.get("AUTODW_BATCH_CONCURRENCY", 4))  # Files of one /upload/batch ingested at once
+PREVIEW_ROWS = 5
+PREVIEW_MAX_BYTES = 1024 * 1024  # Never keep more than 1 MB around for the preview
+
+# Worker pool settings - all parsing, classification and writing runs here
+WORKER_POOL_KIND = os.environ.get("AUTODW_POOL", "process")  # "process" or "thread"
+WORKER_POOL_SIZE = int(os.environ.get("AUTODW_WORKERS", os.cpu_count() or 2))
+WORKER_QUEUE_DEPTH = int(os.environ.get("AUTODW_QUEUE_DEPTH", 32))  # Waiting tasks before 503
+
+_pool_executor = None
+_pool_slots = None
+_pool_waiting = 0
+_pool_running = 0
+
+# Prometheus metrics on /metrics (prometheus-client is optional)
+METRICS_ENABLED = importlib.util.find_spec("prometheus_client") is not None
+_stage_log = threading.local()  # Stage timings collected inside a worker pool task
+
+# Background build jobs
+MAX_FINISHED_JOBS = 100  # Finished jobs kept around for /jobs polling
+_jobs: Dict[str, Dict[str, Any]] = {}
+_job_tasks = set()  # Strong references so running jobs aren't garbage collected
+_build_lock = None  # Builds share data/output, so jobs run one at a time
+_job_revisions = itertools.count(1)  # Orders the job snapshots shared with other server workers
+
+app = FastAPI(title="AutoDW", version="2.0.0")
+
+# Add CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+UPLOAD_DIR = "data/uploads"
+OUTPUT_DIR = "data/output"
+UPLOAD_OBJECTS_DIR = os.path.join(UPLOAD_DIR, ".objects")  # Upload content stored once per hash
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+os.makedirs(UPLOAD_OBJECTS_DIR, exist_ok=True)
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+# Build manifest: upload signature -> generated project, used for incremental builds
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, "manifest.json")
+BUILD_LOCK_PATH = os.path.join(OUTPUT_DIR, ".build.lock")  # Held by whichever server worker is building
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Output table format: "csv", or columnar "parquet" / "feather" (Arrow IPC, needs pyarrow)
+OUTPUT_FORMATS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+OUTPUT_FORMAT = os.environ.get("AUTODW_OUTPUT_FORMAT", "csv")
+ROW_GROUP_SIZE = 100_000  # Rows per Parquet row group / Arrow record batch
+ROW_INDEX_STRIDE = 10_000  # CSV tables record the byte offset of every Nth row for ranged previews
+PREVIEW_MAX_LIMIT = 1000
+
+# Schema inference: decide dtypes and table role from a sample, then read typed in chunks
+SCHEMA_PREFIX_ROWS = 10_000  # Rows read from the start of the file
+SCHEMA_SAMPLE_BLOCKS = 32  # Random blocks sampled from the rest of the file
+SCHEMA_SAMPLE_BLOCK_BYTES = 64 * 1024
+CATEGORY_MAX_RATIO = 0.5  # Text columns with fewer distinct values than this become categories
+CSV_CHUNK_ROWS = 200_000
+
+# Out-of-core builds: CSVs whose estimated in-memory size exceeds half the budget are
+# built chunk by chunk. The budget applies to each build running on the worker pool.
+BUILD_MEMORY_BUDGET = int(os.environ.get("AUTODW_MEMORY_MB", 1024)) * 1024 * 1024
+
+# Star schema normalization: low-cardinality text columns of fact tables move to dimensions
+NORMALIZE_TABLES = os.environ.get("AUTODW_NORMALIZE", "true").lower() != "false"
+DIM_MAX_CARDINALITY_RATIO = 0.2  # Distinct values / rows for a column to become a dimension
+DIM_MAX_DISTINCT = 100_000
+
+# Cross-file relationship discovery from per-column bottom-k hash sketches
+SKETCH_SIZE = 256  # Smallest value hashes kept per column
+FK_MIN_CONTAINMENT = 0.9  # Share of a fact column's values that must exist in the dimension key
+KEY_MIN_UNIQUENESS = 0.95  # Distinct values / rows for a dimension column to act as a key
+
+# SQL queries over generated tables: DuckDB when installed, otherwise a SQLite copy of each project
+QUERY_ENGINE = os.environ.get("AUTODW_QUERY_ENGINE",
+                              "duckdb" if importlib.util.find_spec("duckdb") else "sqlite")
+QUERY_TIMEOUT = float(os.environ.get("AUTODW_QUERY_TIMEOUT", 60))  # Seconds before a query is interrupted
+QUERY_BATCH_ROWS = 1000  # Rows fetched per streamed batch
+QUERY_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Column profiles written next to each generated table
+PROFILE_TOP_K = 10  # Most frequent values reported per column
+PROFILE_TOP_CAPACITY = 1000  # Value counters kept while merging chunks; top values are approximate beyond this
+PROFILE_HISTOGRAM_BINS = 20  # Equal-width bins per numeric column (must be even)
+
+# Append mode: recurring fact feeds land as new partitions of an existing project's fact table
+PARTITION_LOAD_KEY = "load_date"  # Partition column when a feed is split by the day it was loaded
+PARTITION_NULL_VALUE = "__null__"
+PARTITION_MAX_OPEN_WRITERS = 64  # Partition files kept open at once while splitting a table
+PARTITION_MAX_VALUES = 1000  # Distinct partitions one append may create or extend
+
+# Project zip downloads: streamed with data descriptors and Zip64 records, resumable via Range
+ZIP_COMPRESSION_LEVEL = 6
+ZIP_READ_SIZE = 1024 * 1024
+
+# PDF extraction: pages are extracted in parallel batches and cached by file hash + page number
+PDF_CACHE_DIR = "data/cache/pdf_pages"
+PDF_PAGES_PER_TASK = 8
+
+# Project metadata index answering /api/projects without scanning data/output
+METADATA_DB_PATH = os.path.join(OUTPUT_DIR, "projects.db")
+PROJECT_SORT_FIELDS = {"built_at", "created_at", "project_name", "total_size_mb", "file_count",
+                       "fact_tables_count", "dim_tables_count"}
+_metadata_ready = False
+
+# Mount static files
+app.mount("/css", StaticFiles(directory="static/css"), name="css")
+app.mount("/js", StaticFiles(directory="static/js"), name="js")
+
+# Setup templates
+templates = Jinja2Templates(directory="templates")
+
+# MODELS
+
+class UploadResponse(BaseModel):
+    filename: str
+    rows: int
+    columns: List[str]
+    file_size: int
+    preview: List[Dict[str, Any]]
+
+class BuildResponse(BaseModel):
+    project_id: str
+    status: str
+    fact_tables: List[str]
+    dimension_tables: List[str]
+    relationships: int
+    message: str
+    output_files: List[str]
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: str
+    total_files: int
+    message: str
+
+class QueryRequest(BaseModel):
+    sql: str
+    format: str = "ndjson"
+
+class AppendRequest(BaseModel):
+    files: List[str]
+    partition_by: Optional[str] = None
+
+# METRICS
+
+if METRICS_ENABLED:
+    from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+    
+    STAGE_SECONDS = Histogram(
+        "autodw_stage_seconds", "Time spent in a pipeline stage", ["stage"],
+        buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+    )
+    STAGE_BYTES_RATE = Histogram(
+        "autodw_stage_bytes_per_second", "Bytes processed per second by a pipeline stage", ["stage"],
+        buckets=(1e5, 1e6, 1e7, 5e7, 1e8, 2.5e8, 5e8, 1e9)
+    )
+    STAGE_ROWS_RATE = Histogram(
+        "autodw_stage_rows_per_second", "Rows (pages for pdf_extract) processed per second by a pipeline stage",
+        ["stage"], buckets=(10, 100, 1e3, 1e4, 1e5, 1e6, 1e7)
+    )
+    STAGE_FAILURES = Counter("autodw_stage_failures_total", "Pipeline stage runs that raised", ["stage"])
+    POOL_WAIT_SECONDS = Histogram(
+        "autodw_pool_wait_seconds", "Time tasks wait for a worker pool slot",
+        buckets=(0.001, 0.01, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+    )
+    Gauge("autodw_pool_waiting", "Tasks waiting for a worker pool slot").set_function(lambda: _pool_waiting)
+    Gauge("autodw_pool_running", "Tasks running on the worker pool").set_function(lambda: _pool_running)
+    Gauge("autodw_build_jobs_active", "Build jobs queued or running").set_function(
+        lambda: sum(1 for job in _jobs.values() if job["status"] in ("queued", "running"))
+    )
+    # The /health startup timings; NaN until the phase has finished
+    STARTUP_SECONDS = Gauge("autodw_startup_seconds", "Module import, time until serving and warm-up, in seconds",
+                            ["phase"])
+    for phase in ("import", "ready", "warmup"):
+        STARTUP_SECONDS.labels(phase).set_function(
+            lambda key=f"{phase}_seconds": float("nan") if _startup[key] is None else _startup[key]
+        )
+
+def observe_stage(stage: str, seconds: float, bytes_count: Optional[int] = None,
+                  rows: Optional[int] = None, failed: bool = False):
+    if not METRICS_ENABLED:
+        return
+    if failed:
+        STAGE_FAILURES.labels(stage).inc()
+        return
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    if seconds > 0:
+        if bytes_count is not None:
+            STAGE_BYTES_RATE.labels(stage).observe(bytes_count / seconds)
+        if rows is not None:
+            STAGE_ROWS_RATE.labels(stage).observe(rows / seconds)
+
+def record_stage(stage: str, seconds: float, bytes_count: Optional[int] = None,
+                 rows: Optional[int] = None, failed: bool = False):
+    """Record one run of a pipeline stage.
+
+    Inside a worker pool task the timing is collected and handed back to the
+    server process with the task's result, since worker processes have their
+    own (unexported) metrics.
+    """
+    entry = (stage, seconds, bytes_count, rows, failed)
+    log = getattr(_stage_log, "entries", None)
+    if log is not None:
+        log.append(entry)
+    else:
+        observe_stage(*entry)
+
+@contextlib.contextmanager
+def stage_timer(stage: str):
+    """Time a pipeline stage; set "bytes" / "rows" on the yielded dict to record throughput"""
+    sizes = {}
+    start = time.perf_counter()
+    try:
+        yield sizes
+    except Exception:
+        record_stage(stage, time.perf_counter() - start, failed=True)
+        raise
+    record_stage(stage, time.perf_counter() - start, sizes.get("bytes"), sizes.get("rows"))
+
+def call_with_timings(func, *args):
+    """Run a worker pool task, returning its result with the stage timings it recorded"""
+    _stage_log.entries = []
+    try:
+        return func(*args), _stage_log.entries
+    finally:
+        _stage_log.entries = None
+
+# WORKER POOL
+
+def get_executor():
+    """Create the shared worker pool on first use"""
+    global _pool_executor
+    if _pool_executor is None:
+        if WORKER_POOL_KIND == "thread":
+            _pool_executor = ThreadPoolExecutor(max_workers=WORKER_POOL_SIZE, thread_name_prefix="autodw")
+        else:
+            _pool_executor = ProcessPoolExecutor(max_workers=WORKER_POOL_SIZE)
+    return _pool_executor
+
+async def run_in_pool(func, *args, reject_when_full: bool = True):
+    """Run a blocking function on the worker pool without blocking the event loop.
+
+    At most WORKER_POOL_SIZE tasks run at once. When WORKER_QUEUE_DEPTH tasks
+    are already waiting, request-path callers get a 503 instead of piling up;
+    background callers pass reject_when_full=False to wait for a slot.
+    """
+    global _pool_slots, _pool_waiting, _pool_running
+    if _pool_slots is None:
+        _pool_slots = asyncio.Semaphore(WORKER_POOL_SIZE)
+    
+    if reject_when_full and _pool_slots.locked() and _pool_waiting >= WORKER_QUEUE_DEPTH:
+        raise HTTPException(503, "Server is busy processing other files, try again shortly")
+    
+    _pool_waiting += 1
+    queued_at = time.perf_counter()
+    try:
+        await _pool_slots.acquire()
+    finally:
+        _pool_waiting -= 1
+    if METRICS_ENABLED:
+        POOL_WAIT_SECONDS.observe(time.perf_counter() - queued_at)
+    
+    if _pool_executor is None:
+        # Worker processes fork from this one: import the data libraries first so they inherit them
+        await run_in_threadpool(load_data_libraries)
+    
+    _pool_running += 1
+    try:
+        loop = asyncio.get_running_loop()
+        result, timings = await loop.run_in_executor(get_executor(), functools.partial(call_with_timings, func, *args))
+    finally:
+        _pool_running -= 1
+        _pool_slots.release()
+    for entry in timings:
+        observe_stage(*entry)
+    return result
+
+@app.on_event("shutdown")
+def shutdown_pool():
+    """Stop worker processes with the server"""
+    global _pool_executor
+    if _pool_executor is not None:
+        _pool_executor.shutdown(wait=False, cancel_futures=True)
+        _pool_executor = None
+
+# STARTUP
+
+def load_data_libraries():
+    for alias in LAZY_MODULES:
+        load_module(alias)
+
+def compile_templates():
+    """Compile every page template now rather than on its first request"""
+    for name in templates.env.list_templates():
+        templates.get_template(name)
+
+def warm_worker() -> int:
+    return os.getpid()
+
+async def warm_up():
+    """Import the data libraries, compile templates and start the worker pool"""
+    started = time.perf_counter()
+    try:
+        await run_in_threadpool(load_data_libraries)
+        await run_in_threadpool(compile_templates)
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(get_executor(), warm_worker) for _ in range(WORKER_POOL_SIZE)])
+    except Exception as e:
+        print(f"Warm-up failed: {e}")
+        return
+    _startup["warmup_seconds"] = round(time.perf_counter() - started, 3)
+
+@app.on_event("startup")
+async def start_up():
+    """Record startup timings, warming up before or after the server starts serving per STARTUP_MODE"""
+    if STARTUP_MODE == "eager":
+        await warm_up()
+    elif STARTUP_MODE == "warm":
+        start_job(warm_up())
+    _startup["ready_seconds"] = round(time.perf_counter() - _import_started, 3)
+
+# FILE PROCESSING
+
+# Quote states of CsvStreamStats
+CSV_UNQUOTED, CSV_QUOTED, CSV_QUOTE_PENDING = 0, 1, 2
+# A quoted field that starts a field and whose closing quote is known not to be escaped
+CSV_QUOTED_FIELD = re.compile(rb'"(?<![^,\n]")[^"]*(?:""[^"]*)*"(?=[^"])')
+CSV_QUOTED_REST = re.compile(rb'[^"]*(?:""[^"]*)*"(?=[^"])')  # The rest of an open quoted field
+CSV_FIELD_QUOTE = re.compile(rb'"(?<![^,\n]")')
+CSV_SEPARATOR = re.compile(rb'[,\n]')
+CSV_BLANK_LINE = re.compile(rb"\n\r?(?=\n)")  # A newline ending a line that is empty
+
+class CsvStreamStats:
+    """Incrementally computes row count and a preview while a CSV streams in.
+
+    Only the first PREVIEW_MAX_BYTES are kept in memory (for the header and
+    preview rows); everything after that is just scanned for record breaks,
+    so memory stays constant regardless of file size. Records are counted the
+    way pandas reads them: a quote only opens a quoted field at the start of
+    a field, "" inside quotes is an escaped quote, and blank lines are skipped.
+    """
+
+    def __init__(self):
+        self.head = bytearray()
+        self.head_records = 0
+        self.records = 0
+        self.state = CSV_UNQUOTED
+        self.at_field_start = True
+        self.line_has_content = False
+        self.size = 0
+
+    def feed(self, chunk: bytes):
+        if not chunk:
+            return
+        self.size += len(chunk)
+        if len(self.head) < PREVIEW_MAX_BYTES and self.head_records <= PREVIEW_ROWS:
+            self.head.extend(chunk[:PREVIEW_MAX_BYTES - len(self.head)])
+        self.scan(chunk)
+        if self.head_records <= PREVIEW_ROWS:
+            self.head_records = self.records
+
+    def scan(self, chunk: bytes):
+        """Count the records a chunk ends, carrying the quote state over to the next one"""
+        pos = 0
+        if self.state != CSV_UNQUOTED:
+            # Finish the quoted field left open by the previous chunk
+            if self.state == CSV_QUOTE_PENDING and chunk[:1] == b'"':
+                self.state, pos = CSV_QUOTED, 1  # An escaped quote
+            if self.state == CSV_QUOTED:
+                closing = CSV_QUOTED_REST.match(chunk, pos)
+                if closing is None:
+                    self.open_quoted(chunk[pos:])
+                    return
+                pos = closing.end()
+            self.state = CSV_UNQUOTED
+            self.at_field_start = False
+        
+        if not self.at_field_start:
+            # Quotes are literal (e.g. 5" pipe) until the field ends
+            separator = CSV_SEPARATOR.search(chunk, pos)
+            end = separator.start() if separator else len(chunk)
+            self.scan_unquoted(chunk[pos:end])
+            pos = end
+        
+        text = chunk[pos:] if pos else chunk
+        if b'"' in text:
+            # Newlines inside quoted fields don't end a record. A closing quote at the very
+            # end may still be the first half of an escaped "", so that field stays open
+            text = CSV_QUOTED_FIELD.sub(b"q", text)
+            opening = CSV_FIELD_QUOTE.search(text)
+            if opening is not None:
+                self.scan_unquoted(text[:opening.start()])
+                self.open_quoted(text[opening.end():])
+                return
+        self.scan_unquoted(text)
+
+    def open_quoted(self, text: bytes):
+        """Track a quoted field that runs to the end of the chunk.
+
+        The field can only hold quotes in a final run, since any quote followed
+        by something else would have closed it; an odd run ends on a quote that
+        either closes the field or starts an escaped "".
+        """
+        run = len(text) - len(text.rstrip(b'"'))
+        self.state = CSV_QUOTE_PENDING if run % 2 else CSV_QUOTED
+        self.line_has_content = True
+
+    def scan_unquoted(self, text: bytes):
+        """Count the records ended by newlines in unquoted text, skipping blank lines"""
+        if not text:
+            return
+        last = text.rfind(b"\n")
+        if last < 0:
+            self.line_has_content = self.line_has_content or bool(text.strip(b"\r"))
+        else:
+            ends = text.count(b"\n") - len(CSV_BLANK_LINE.findall(text))
+            if not (self.line_has_content or text[:text.find(b"\n")].strip(b"\r")):
+                ends -= 1
+            self.records += ends
+            self.line_has_content = bool(text[last + 1:].strip(b"\r"))
+        self.at_field_start = text[-1] in b",\n"
+
+    @property
+    def total_records(self) -> int:
+        # A final record without a trailing newline still counts
+        return self.records + 1 if self.line_has_content else self.records
+
+    def result(self):
+        """Return (rows, columns, preview) for the streamed CSV."""
+        if not self.head:
+            raise ValueError("CSV file is empty")
+        head = bytes(self.head)
+        if self.size > len(head):
+            # Drop the partial record at the end of the kept prefix
+            head = head[:head.rfind(b"\n") + 1] or head
+        df = pd.read_csv(io.BytesIO(head), nrows=PREVIEW_ROWS)
+        rows = max(self.total_records - 1, 0)  # Subtract header
+        return rows, list(df.columns), df.head(PREVIEW_ROWS).to_dict(orient='records')
+
+def write_chunk(f, chunk: bytes, hasher, stats: "CsvStreamStats" = None):
+    """Write one upload chunk and update the content hash and streaming CSV stats"""
+    f.write(chunk)
+    hasher.update(chunk)
+    if stats is not None:
+        stats.feed(chunk)
+
+def new_file_hasher():
+    """Hash used for upload content (incremental builds and the PDF page cache)"""
+    return hashlib.blake2b(digest_size=16)
+
+def file_hash(file_path: str) -> str:
+    """Fast content hash of a file, read in chunks"""
+    h = new_file_hasher()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def load_manifest() -> Dict[str, Dict[str, Any]]:
+    """Load the build manifest, treating a missing or corrupt one as empty"""
+    try:
+        with open(MANIFEST_PATH, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(manifest: Dict[str, Dict[str, Any]]):
+    """Atomically replace the build manifest"""
+    tmp_path = f"{MANIFEST_PATH}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+def project_is_intact(entry: Dict[str, Any]) -> bool:
+    """Check that every output file (or partitioned table directory) recorded for a project still exists"""
+    project_dir = os.path.join(OUTPUT_DIR, f"project_{entry['project_id']}")
+    return all(os.path.exists(os.path.join(project_dir, f)) for f in entry["output_files"])
+
+def plan_build(files: List[str], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Split uploads into unchanged and changed files using the manifest.
+
+    Size and mtime are compared first; the content hash is only computed when
+    they differ, so unchanged uploads cost one stat call. Hashes recorded by the
+    upload store are reused instead of reading the file again. Uploads built with
+    different options (output format, normalization) are always rebuilt.
+    
+    Uploads with the same content as another one share its project: they are
+    returned in duplicates (name -> source name) and never built twice. Also
+    returns the projects that must be removed because their source changed or is gone
+    (partitioned projects are kept; a changed source then gets a project of its own).
+    """
+    manifest = load_manifest()
+    known_hashes = upload_hashes(files)
+    unchanged = {}
+    changed = {}
+    duplicates = {}
+    
+    for file in files:
+        file_path = os.path.join(UPLOAD_DIR, file)
+        st = os.stat(file_path)
+        signature = {"size": st.st_size, "mtime": st.st_mtime}
+        entry = manifest.get(file)
+        
+        if entry and entry.get("options") == options and project_is_intact(entry):
+            if entry["size"] == st.st_size and entry["mtime"] == st.st_mtime:
+                unchanged[file] = entry
+                continue
+            signature["hash"] = known_hashes.get(file) or file_hash(file_path)
+            if entry["size"] == st.st_size and entry.get("hash") == signature["hash"]:
+                # Touched but identical - just refresh the recorded mtime
+                unchanged[file] = {**entry, **signature}
+                continue
+        else:
+            signature["hash"] = known_hashes.get(file) or file_hash(file_path)
+        changed[file] = signature
+    
+    # Point changed uploads at an existing project or another changed upload with the same content
+    sources = {}
+    for file, entry in unchanged.items():
+        sources.setdefault((entry.get("hash"), file.endswith('.pdf')), file)
+    for file, signature in list(changed.items()):
+        source = sources.setdefault((signature["hash"], file.endswith('.pdf')), file)
+        if source == file:
+            continue
+        duplicates[file] = source
+        if source in unchanged:
+            unchanged[file] = {**unchanged[source], **signature}
+            del changed[file]
+    
+    # A project stays while any kept upload still refers to it. Partitioned projects hold
+    # appended history their source upload alone can't rebuild, so they are never dropped
+    kept_projects = {entry["project_id"] for entry in unchanged.values()}
+    kept_projects.update(entry["project_id"] for entry in manifest.values() if entry.get("partitioned"))
+    stale_projects = list(dict.fromkeys(
+        entry["project_id"] for file, entry in manifest.items()
+        if file not in unchanged and entry["project_id"] not in kept_projects
+    ))
+    return {"unchanged": unchanged, "changed": changed, "duplicates": duplicates,
+            "stale_projects": stale_projects}
+
+def remove_projects(project_ids: List[str]):
+    """Delete generated project directories"""
+    for project_id in project_ids:
+        project_dir = os.path.join(OUTPUT_DIR, f"project_{project_id}")
+        if os.path.isdir(project_dir):
+            shutil.rmtree(project_dir)
+
+def is_fact_table(numeric_count: int, column_count: int, row_count: int) -> bool:
+    """Simple detection: if has numeric columns and many rows -> fact"""
+    return numeric_count > column_count / 2 and row_count > 10
+
+def sample_csv(file_path: str):
+    """Read the first SCHEMA_PREFIX_ROWS rows plus random blocks from the rest of the file.
+
+    Everything is read as text so types can be decided from the sample. Returns
+    (sample, prefix_row_count, truncated) where truncated means the file has
+    more rows than the prefix.
+    """
+    prefix = pd.read_csv(file_path, nrows=SCHEMA_PREFIX_ROWS + 1, dtype=str)
+    truncated = len(prefix) > SCHEMA_PREFIX_ROWS
+    prefix = prefix.iloc[:SCHEMA_PREFIX_ROWS]
+    if not truncated:
+        return prefix, len(prefix), False
+    
+    # Random seeks can land inside a quoted multi-line value, so only sample
+    # blocks when the prefix shows no embedded newlines
+    if any(prefix[col].str.contains("\n", regex=False).any() for col in prefix.columns):
+        return prefix, len(prefix), True
+    
+    size = os.path.getsize(file_path)
+    rng = random.Random(size)  # Reproducible sample for the same file
+    blocks = [prefix]
+    with open(file_path, 'rb') as f:
+        for offset in sorted(rng.randrange(size) for _ in range(SCHEMA_SAMPLE_BLOCKS)):
+            f.seek(offset)
+            block = f.read(SCHEMA_SAMPLE_BLOCK_BYTES)
+            # Keep only complete lines
+            start = block.find(b"\n") + 1
+            end = block.rfind(b"\n") + 1
+            if start <= 0 or end <= start:
+                continue
+            try:
+                blocks.append(pd.read_csv(io.BytesIO(block[start:end]), header=None,
+                                          names=list(prefix.columns), dtype=str))
+            except Exception:
+                continue
+    
+    return pd.concat(blocks, ignore_index=True), len(prefix), True
+
+def infer_schema(file_path: str) -> Dict[str, Any]:
+    """Decide column dtypes and the fact/dimension role of a CSV from a bounded sample"""
+    sample, prefix_rows, truncated = sample_csv(file_path)
+    dtypes = {}
+    numeric_count = 0
+    
+    for col in sample.columns:
+        values = sample[col].dropna()
+        numbers = pd.to_numeric(values, errors='coerce')
+        
+        integral = len(values) and numbers.notna().all() and (numbers % 1 == 0).all()
+        low, high = (numbers.min().item(), numbers.max().item()) if integral else (0, 0)
+        
+        if integral and -2 ** 63 <= low and high < 2 ** 63:
+            numeric_count += 1
+            # Nullable ints keep integer columns integral even when values are missing
+            dtypes[col] = "Int64"
+        elif integral and 0 <= low and high < 2 ** 64:
+            numeric_count += 1
+            dtypes[col] = "UInt64"
+        elif integral:
+            # Integers beyond 64 bits (e.g. long ids) stay exact as text
+            dtypes[col] = "str"
+        elif len(values) and numbers.notna().all():
+            numeric_count += 1
+            dtypes[col] = "float64"
+        elif len(values) and values.nunique() <= CATEGORY_MAX_RATIO * len(values):
+            dtypes[col] = "category"
+        else:
+            dtypes[col] = "str"
+    
+    # Only the "more than 10 rows" threshold matters, and the prefix answers it
+    row_count = prefix_rows if not truncated else SCHEMA_PREFIX_ROWS
+    role = "fact" if is_fact_table(numeric_count, len(sample.columns), row_count) else "dimension"
+    
+    # Text-typed sample memory per row overestimates the typed frame, which is the safe side
+    row_bytes = max(int(sample.memory_usage(deep=True).sum() / max(len(sample), 1)), 1)
+    
+    return {"dtypes": dtypes, "role": role, "sampled_rows": len(sample), "row_bytes": row_bytes}
+
+def needs_streaming(file: str, schema: Dict[str, Any]) -> bool:
+    """True if loading the whole CSV would take more than half of BUILD_MEMORY_BUDGET"""
+    rows, _ = estimate_csv_stats(file, os.path.getsize(os.path.join(UPLOAD_DIR, file)))
+    return rows * schema["row_bytes"] > BUILD_MEMORY_BUDGET / 2
+
+def read_csv_typed(file_path: str, dtypes: Dict[str, str]) -> pd.DataFrame:
+    """Load a CSV in chunks using an inferred dtype map.
+
+    Falls back to a plain pandas read if the sample missed a value that does
+    not fit the inferred types.
+    """
+    try:
+        chunks = list(pd.read_csv(file_path, dtype=dtypes, chunksize=CSV_CHUNK_ROWS))
+    except (ValueError, TypeError, OverflowError):
+        # The sample missed a value that does not fit; counted as a schema_fit failure
+        record_stage("schema_fit", 0.0, failed=True)
+        return pd.read_csv(file_path)
+    
+    if not chunks:
+        return pd.read_csv(file_path, dtype=dtypes)
+    
+    # Categories differ per chunk; union them so columns stay categorical
+    columns = {}
+    for col in chunks[0].columns:
+        if dtypes.get(col) == "category":
+            columns[col] = pd.Categorical(pd.api.types.union_categoricals([c[col] for c in chunks]))
+        else:
+            columns[col] = pd.concat([c[col] for c in chunks], ignore_index=True)
+    return pd.DataFrame(columns)
+
+def functionally_determines(key_codes, other_codes) -> bool:
+    """True if every value of the key column maps to exactly one value of the other column"""
+    pairs = key_codes.astype('int64') * (int(other_codes.max()) + 1) + other_codes
+    return len(pd.unique(pairs)) == len(pd.unique(key_codes))
+
+def surrogate_key_name(key: str, columns) -> str:
+    return f"{key}_key" if f"{key}_key" not in columns else f"{key}_sk"
+
+def plan_dimensions(df: pd.DataFrame):
+    """Group low-cardinality text columns with the columns they determine.
+
+    Returns (groups, codes): each group is a list of columns led by its key
+    column, and codes holds the factorized values of every candidate column.
+    """
+    max_distinct = min(DIM_MAX_CARDINALITY_RATIO * len(df), DIM_MAX_DISTINCT)
+    numeric = set(df.select_dtypes(include=['number']).columns)
+    
+    codes = {}
+    for col in df.columns:
+        if col in numeric:
+            continue
+        col_codes, uniques = pd.factorize(df[col], use_na_sentinel=False)
+        if 1 < len(uniques) <= max_distinct:
+            codes[col] = col_codes
+    
+    # Highest-cardinality columns become group keys first, so they absorb the
+    # coarser attributes that depend on them
+    candidates = sorted(codes, key=lambda c: codes[c].max(), reverse=True)
+    groups = []
+    assigned = set()
+    for key in candidates:
+        if key in assigned:
+            continue
+        group = [key] + [
+            col for col in candidates
+            if col != key and col not in assigned and functionally_determines(codes[key], codes[col])
+        ]
+        assigned.update(group)
+        groups.append(group)
+    
+    return groups, codes
+
+def normalize_star_schema(df: pd.DataFrame):
+    """Split a wide fact table into a narrow fact table plus deduplicated dimensions.
+
+    Low-cardinality text columns are grouped with the columns they determine
+    (e.g. product_id -> product_name, category) and each group becomes a
+    dim_<key> table with an integer surrogate key assigned by factorize. The
+    fact table keeps the surrogate keys and the remaining (measure) columns.
+    Returns (fact_df, {dimension name: dimension DataFrame}).
+    """
+    groups, codes = plan_dimensions(df)
+    fact = df.drop(columns=[col for group in groups for col in group])
+    dimensions = {}
+    for group in groups:
+        key = group[0]
+        key_name = surrogate_key_name(key, df.columns)
+        # Codes are 0..n-1, so the first row holding code i describes member i
+        _, first_rows = np.unique(codes[key], return_index=True)
+        dim = df[group].iloc[first_rows].reset_index(drop=True)
+        dim.insert(0, key_name, np.arange(1, len(dim) + 1))
+        fact.insert(len(dimensions), key_name, codes[key] + 1)
+        dimensions[f"dim_{key}".lower()] = dim
+    
+    return fact, dimensions
+
+def is_fact_after_split(fact_df: pd.DataFrame, key_columns: List[str]) -> bool:
+    """A wide export is a fact table if what remains besides the keys is mostly measures"""
+    rest = fact_df.drop(columns=key_columns)
+    numeric_cols = rest.select_dtypes(include=['number']).columns.tolist()
+    return is_fact_table(len(numeric_cols), len(rest.columns), len(rest))
+
+class DimensionOverflow(Exception):
+    """A streamed dimension outgrew the limits plan_dimensions applied to the first chunk"""
+
+class StreamingStarSchema:
+    """Applies dimension groups planned on a first chunk to a stream of chunks.
+
+    Each dimension member (the distinct combination of its group's values)
+    gets the next surrogate key the first time it is seen, so keys stay
+    consistent across chunks while only the members are kept in memory.
+    After every chunk each group is held to the same cardinality limits as
+    the plan, over all rows seen so far; DimensionOverflow is raised when
+    one is exceeded.
+    """
+
+    def __init__(self, groups: List[List[str]], columns):
+        self.groups = groups
+        self.key_names = [surrogate_key_name(group[0], columns) for group in groups]
+        self.members = [{} for _ in groups]
+        self.dtypes = {}
+        self.rows = 0
+
+    def split(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Replace the grouped columns of a chunk with their surrogate keys"""
+        fact = chunk.drop(columns=[col for group in self.groups for col in group])
+        self.rows += len(chunk)
+        max_distinct = min(DIM_MAX_CARDINALITY_RATIO * self.rows, DIM_MAX_DISTINCT)
+        for i, group in enumerate(self.groups):
+            for col in group:
+                # Chunk categories only cover that chunk, so dimensions get fresh ones
+                dtype = chunk[col].dtype
+                self.dtypes.setdefault(col, "category" if isinstance(dtype, pd.CategoricalDtype) else dtype)
+            local_codes, uniques = pd.MultiIndex.from_frame(chunk[group]).factorize()
+            members = self.members[i]
+            keys = np.array([
+                members.setdefault(tuple(None if pd.isna(v) else v for v in member), len(members) + 1)
+                for member in uniques
+            ], dtype='int64')
+            if len(members) > max_distinct:
+                raise DimensionOverflow(f"{group[0]} has over {len(members) - 1} distinct members")
+            fact.insert(i, self.key_names[i], keys[local_codes])
+        return fact
+
+    def dimensions(self) -> Dict[str, pd.DataFrame]:
+        dimensions = {}
+        for group, key_name, members in zip(self.groups, self.key_names, self.members):
+            dim = pd.DataFrame(list(members), columns=group)
+            dim = dim.astype({col: self.dtypes[col] for col in group if col in self.dtypes})
+            dim.insert(0, key_name, np.arange(1, len(dim) + 1))
+            dimensions[f"dim_{group[0]}".lower()] = dim
+        return dimensions
+
+def row_index_path(file_path: str) -> str:
+    """Sidecar row-offset index of a CSV table, kept in the project's hidden .index directory"""
+    project_dir, name = os.path.split(file_path)
+    return os.path.join(project_dir, ".index", f"{name}.json")
+
+def load_row_index(file_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(row_index_path(file_path), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+class IndexedCsvWriter:
+    """Writes a CSV table chunk by chunk while recording a sparse row-offset index.
+
+    The byte offset of every ROW_INDEX_STRIDE-th data row is saved next to the
+    table, so a preview of any row range can seek straight to it.
+    """
+
+    def __init__(self, output_path: str, columns: List[str]):
+        self.output_path = output_path
+        self.columns = [str(c) for c in columns]
+        self.rows = 0
+        self.offsets = []
+        self.f = open(output_path, 'wb')
+        pd.DataFrame(columns=self.columns).to_csv(self.f, index=False)
+
+    def write(self, df: pd.DataFrame):
+        start = 0
+        while start < len(df):
+            if self.rows % ROW_INDEX_STRIDE == 0:
+                self.offsets.append(self.f.tell())
+            take = min(ROW_INDEX_STRIDE - self.rows % ROW_INDEX_STRIDE, len(df) - start)
+            df.iloc[start:start + take].to_csv(self.f, header=False, index=False)
+            self.rows += take
+            start += take
+
+    def close(self):
+        self.f.close()
+        index_path = row_index_path(self.output_path)
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        with open(index_path, 'w') as f:
+            json.dump({
+                "rows": self.rows,
+                "stride": ROW_INDEX_STRIDE,
+                "columns": self.columns,
+                "offsets": self.offsets
+            }, f)
+
+class ColumnarWriter:
+    """Writes a Parquet or Arrow IPC table chunk by chunk.
+
+    The first chunk fixes the schema (categories are stored as plain values,
+    since each chunk has its own dictionary). Arrow batches are re-cut to
+    ROW_GROUP_SIZE rows so previews can still jump to a batch by row number.
+    """
+
+    def __init__(self, output_path: str, output_format: str):
+        self.output_path = output_path
+        self.output_format = output_format
+        self.writer = None
+        self.schema = None
+        self.pending = []
+        self.pending_rows = 0
+
+    def write(self, df: pd.DataFrame):
+        import pyarrow as pa
+        
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self.schema is None:
+            metadata = dict(table.schema.metadata or {})
+            if self.output_format == "feather":
+                # The row count is unknown up front, but every batch but the last is full,
+                # so previews derive it from the batch count and the last batch
+                metadata[b"autodw.fixed_batch_rows"] = str(ROW_GROUP_SIZE).encode()
+            self.schema = pa.schema([
+                pa.field(f.name, f.type.value_type if pa.types.is_dictionary(f.type) else f.type)
+                for f in table.schema
+            ], metadata=metadata)
+            self.open()
+        table = table.cast(self.schema)
+        
+        if self.output_format == "parquet":
+            self.writer.write_table(table, row_group_size=ROW_GROUP_SIZE)
+            return
+        
+        self.pending.append(table)
+        self.pending_rows += table.num_rows
+        if self.pending_rows >= ROW_GROUP_SIZE:
+            self.flush(final=False)
+
+    def open(self):
+        import pyarrow as pa
+        
+        if self.output_format == "parquet":
+            import pyarrow.parquet as pq
+            
+            self.writer = pq.ParquetWriter(self.output_path, self.schema, compression="zstd")
+        else:
+            options = pa.ipc.IpcWriteOptions(compression="zstd")
+            self.writer = pa.ipc.new_file(self.output_path, self.schema, options=options)
+
+    def flush(self, final: bool):
+        import pyarrow as pa
+        
+        table = pa.concat_tables(self.pending).combine_chunks()
+        full = (table.num_rows // ROW_GROUP_SIZE) * ROW_GROUP_SIZE
+        if full:
+            self.writer.write_table(table.slice(0, full), max_chunksize=ROW_GROUP_SIZE)
+        rest = table.slice(full)
+        if final and rest.num_rows:
+            self.writer.write_table(rest)
+            rest = rest.slice(0, 0)
+        self.pending = [rest] if rest.num_rows else []
+        self.pending_rows = rest.num_rows
+
+    def close(self):
+        if self.writer is None:
+            return
+        if self.output_format == "feather" and self.pending:
+            self.flush(final=True)
+        self.writer.close()
+
+def open_table_writer(project_dir: str, table_name: str, columns: List[str], output_format: str):
+    """Return (file name, chunked writer) for a generated table"""
+    file_name = table_name + OUTPUT_FORMATS[output_format]
+    output_path = os.path.join(project_dir, file_name)
+    if output_format == "csv":
+        return file_name, IndexedCsvWriter(output_path, columns)
+    return file_name, ColumnarWriter(output_path, output_format)
+
+def write_table(df: pd.DataFrame, project_dir: str, table_name: str, output_format: str = "csv") -> str:
+    """Write a generated table in the requested format, returning its file name"""
+    file_name = table_name + OUTPUT_FORMATS[output_format]
+    output_path = os.path.join(project_dir, file_name)
+    
+    with stage_timer("output_write") as sizes:
+        if output_format == "parquet":
+            # Typed, compressed columns with per-row-group min/max statistics
+            df.to_parquet(output_path, index=False, compression="zstd", row_group_size=ROW_GROUP_SIZE)
+        elif output_format == "feather":
+            import pyarrow as pa
+            import pyarrow.feather as feather
+            
+            # Chunked columns would split batches at chunk boundaries; combined, every batch
+            # but the last has exactly ROW_GROUP_SIZE rows
+            table = pa.Table.from_pandas(df, preserve_index=False).combine_chunks()
+            # Arrow IPC files have no row count in the footer, so store it for previews
+            metadata = {
+                **(table.schema.metadata or {}),
+                b"autodw.num_rows": str(len(df)).encode(),
+                b"autodw.fixed_batch_rows": str(ROW_GROUP_SIZE).encode()
+            }
+            feather.write_feather(table.replace_schema_metadata(metadata), output_path,
+                                  compression="zstd", chunksize=ROW_GROUP_SIZE)
+        else:
+            writer = IndexedCsvWriter(output_path, list(df.columns))
+            writer.write(df)
+            writer.close()
+        
+        sizes["rows"] = len(df)
+        sizes["bytes"] = os.path.getsize(output_path)
+    
+    return file_name
+
+def write_tables(df: pd.DataFrame, is_fact: bool, project_dir: str, table_name: str,
+                 options: Dict[str, Any]) -> Dict[str, Any]:
+    """Classify and write an in-memory table, with its dimensions when normalizing"""
+    fact_tables = []
+    dim_tables = []
+    output_files = []
+    
+    output_format = options["format"]
+    dimensions = {}
+    
+    if options["normalize"] and len(df) > 10:
+        # Move repeated descriptive columns into dimensions keyed by surrogate ids
+        with stage_timer("normalize") as sizes:
+            fact_df, dimensions = normalize_star_schema(df)
+            sizes["rows"] = len(df)
+        if dimensions and not is_fact:
+            is_fact = is_fact_after_split(fact_df, [dim.columns[0] for dim in dimensions.values()])
+    
+    # Column profiles and sketches of every written table
+    profilers = {}
+    
+    if is_fact:
+        # This is a fact table
+        fact_name = f"fact_{table_name}"
+        fact_tables.append(fact_name)
+        
+        surrogate_keys = []
+        if dimensions:
+            df = fact_df
+            for dim_name, dim_df in dimensions.items():
+                dim_tables.append(dim_name)
+                output_files.append(write_table(dim_df, project_dir, dim_name, output_format))
+                surrogate_keys.append(dim_df.columns[0])
+                profilers[dim_name] = profile_table(dim_df, "dimension", skip=[dim_df.columns[0]])
+        
+        output_files.append(write_table(df, project_dir, fact_name, output_format))
+        profilers[fact_name] = profile_table(df, "fact", skip=surrogate_keys)
+    else:
+        # This is a dimension table
+        dimensions = {}
+        dim_name = f"dim_{table_name}"
+        dim_tables.append(dim_name)
+        
+        output_files.append(write_table(df, project_dir, dim_name, output_format))
+        profilers[dim_name] = profile_table(df, "dimension")
+    
+    return {
+        "fact_tables": fact_tables,
+        "dimension_tables": dim_tables,
+        "output_files": output_files,
+        "sketches": {name: profiler.sketch() for name, profiler in profilers.items()},
+        "profiles": {name: profiler.profile() for name, profiler in profilers.items()},
+        "relationships": len(dimensions)
+    }
+
+def stream_csv_tables(file_path: str, schema: Dict[str, Any], project_dir: str, table_name: str,
+                      options: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a CSV too large for memory chunk by chunk, returning the same result as write_tables.
+
+    Chunks are sized so each takes about an eighth of BUILD_MEMORY_BUDGET.
+    The role and dimension groups are decided on the first chunk; after that
+    each chunk is split, written and sketched before the next one is read, so
+    memory holds one chunk plus the dimension members. A pass that turns out
+    wrong is thrown away and the file is streamed again: as text when a value
+    does not fit the sampled types, unnormalized when a dimension outgrows
+    its limits.
+    """
+    chunk_rows = max(1000, int(BUILD_MEMORY_BUDGET / 8 / schema["row_bytes"]))
+    text_dtypes = {col: "str" for col in schema["dtypes"]}
+    dtypes = schema["dtypes"]
+    while True:
+        try:
+            return stream_csv_pass(file_path, dtypes, schema["role"] == "fact", chunk_rows,
+                                   project_dir, table_name, options)
+        except (ValueError, TypeError, OverflowError):
+            if dtypes == text_dtypes:
+                raise
+            # A value later in the file did not fit the sampled types; start over reading text
+            record_stage("schema_fit", 0.0, failed=True)
+            dtypes = text_dtypes
+        except DimensionOverflow:
+            # Members kept growing past the first chunk; keep the columns in the table instead
+            record_stage("normalize", 0.0, failed=True)
+            options = {**options, "normalize": False}
+        shutil.rmtree(project_dir)
+        os.makedirs(project_dir)
+
+def stream_csv_pass(file_path: str, dtypes: Dict[str, str], is_fact: bool, chunk_rows: int,
+                    project_dir: str, table_name: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    output_format = options["format"]
+    splitter = None
+    writer = None
+    profiler = None
+    # Stage times summed over chunks
+    seconds = {"csv_parse": 0.0, "output_write": 0.0, "profile": 0.0}
+    rows = 0
+    
+    try:
+        reader = iter(pd.read_csv(file_path, dtype=dtypes, chunksize=chunk_rows))
+        while True:
+            started = time.perf_counter()
+            chunk = next(reader, None)
+            seconds["csv_parse"] += time.perf_counter() - started
+            if chunk is None:
+                break
+            rows += len(chunk)
+            
+            if writer is None:
+                if options["normalize"] and len(chunk) > 10:
+                    with stage_timer("normalize") as sizes:
+                        groups, _ = plan_dimensions(chunk)
+                        sizes["rows"] = len(chunk)
+                    if groups:
+                        splitter = StreamingStarSchema(groups, chunk.columns)
+                        if not is_fact:
+                            is_fact = is_fact_after_split(splitter.split(chunk), splitter.key_names)
+                            splitter = StreamingStarSchema(groups, chunk.columns) if is_fact else None
+                name = f"fact_{table_name}" if is_fact else f"dim_{table_name}"
+                role = "fact" if is_fact else "dimension"
+                table = splitter.split(chunk) if splitter else chunk
+                file_name, writer = open_table_writer(project_dir, name, list(table.columns), output_format)
+                profiler = TableProfiler(role, skip=splitter.key_names if splitter else ())
+            else:
+                table = splitter.split(chunk) if splitter else chunk
+            
+            started = time.perf_counter()
+            writer.write(table)
+            seconds["output_write"] += time.perf_counter() - started
+            started = time.perf_counter()
+            profiler.update(table)
+            seconds["profile"] += time.perf_counter() - started
+    finally:
+        if writer is not None:
+            writer.close()
+    
+    record_stage("csv_parse", seconds["csv_parse"], os.path.getsize(file_path), rows)
+    if writer is not None:
+        record_stage("output_write", seconds["output_write"],
+                     os.path.getsize(os.path.join(project_dir, file_name)), rows)
+        record_stage("profile", seconds["profile"], rows=rows)
+    
+    if writer is None:
+        # Header-only file
+        return write_tables(pd.read_csv(file_path, dtype=dtypes), is_fact, project_dir, table_name, options)
+    
+    dimensions = splitter.dimensions() if splitter else {}
+    output_files = []
+    profilers = {}
+    for dim_name, dim_df in dimensions.items():
+        output_files.append(write_table(dim_df, project_dir, dim_name, output_format))
+        profilers[dim_name] = profile_table(dim_df, "dimension", skip=[dim_df.columns[0]])
+    output_files.append(file_name)
+    profilers[name] = profiler
+    
+    return {
+        "fact_tables": [name] if is_fact else [],
+        "dimension_tables": list(dimensions) + ([] if is_fact else [name]),
+        "output_files": output_files,
+        "sketches": {name: profiler.sketch() for name, profiler in profilers.items()},
+        "profiles": {name: profiler.profile() for name, profiler in profilers.items()},
+        "relationships": len(dimensions)
+    }
+
+def build_project(file: str, options: Dict[str, Any], digest: Optional[str] = None) -> Dict[str, Any]:
+    """Classify one uploaded file and write it out as its own project (runs on the worker pool)"""
+    # Generate unique project ID with timestamp, full file name and a random suffix: files
+    # built concurrently in the same second must never share a project directory
+    file_base = file.replace('.csv', '').replace('.pdf', '')
+    safe_base = re.sub(r"[^A-Za-z0-9._-]", "_", file_base)
+    project_id = datetime.now().strftime("%Y%m%d_%H%M%S") + f"_{safe_base}_{uuid.uuid4().hex[:8]}"
+    project_dir = os.path.join(OUTPUT_DIR, f"project_{project_id}")
+    os.makedirs(project_dir)  # Raises FileExistsError rather than writing into another build's project
+    
+    file_path = os.path.join(UPLOAD_DIR, file)
+    
+    table_name = file_base.lower()
+    
+    # Process the file
+    if file.endswith('.csv'):
+        # Types and role come from a sample; the full read is typed and chunked
+        with stage_timer("classify") as sizes:
+            schema = infer_schema(file_path)
+            sizes["rows"] = schema["sampled_rows"]
+        if needs_streaming(file, schema):
+            tables = stream_csv_tables(file_path, schema, project_dir, table_name, options)
+        else:
+            with stage_timer("csv_parse") as sizes:
+                df = read_csv_typed(file_path, schema["dtypes"])
+                sizes["rows"] = len(df)
+                sizes["bytes"] = os.path.getsize(file_path)
+            tables = write_tables(df, schema["role"] == "fact", project_dir, table_name, options)
+    elif file.endswith('.pdf'):
+        # Process PDF and convert to CSV format, reusing cached page text
+        data = iter_pdf_rows(file_path, digest or file_hash(file_path))
+        
+        df = pd.DataFrame(data, columns=["line_number", "content", "word_count"])
+        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
+        is_fact = is_fact_table(len(numeric_cols), len(df.columns), len(df))
+        tables = write_tables(df, is_fact, project_dir, table_name, options)
+    
+    save_index_json(project_dir, "sketches.json", tables["sketches"])
+    save_index_json(project_dir, "profile.json", tables["profiles"])
+    fact_tables = tables["fact_tables"]
+    dim_tables = tables["dimension_tables"]
+    output_files = tables["output_files"]
+    relationships = tables["relationships"]
+    
+    # Create project name based on file
+    clean_name = file_base.replace('_', ' ').replace('-', ' ')
+    clean_name = ' '.join(word.capitalize() for word in clean_name.split())
+    
+    # Create metadata for this individual file project
+    metadata = f"""Project Name: {clean_name}
+Project ID: {project_id}
+Date: {datetime.now()}
+Files: 1
+Source File: {file}
+Fact Tables: {', '.join(fact_tables)}
+Dimension Tables: {', '.join(dim_tables)}
+Relationships: {relationships}
+"""
+    
+    with open(os.path.join(project_dir, "README.txt"), "w") as f:
+        f.write(metadata)
+    
+    output_files.append("README.txt")
+    
+    return {
+        "project_id": project_id,
+        "summary": summarize_project(project_id),
+        "options": options,
+        "fact_tables": fact_tables,
+        "dimension_tables": dim_tables,
+        "relationships": relationships,
+        "output_files": output_files
+    }
+
+def check_columns(available: List[str], columns: Optional[List[str]]) -> Optional[List[str]]:
+    """Validate a requested column projection"""
+    if not columns:
+        return None
+    unknown = [c for c in columns if c not in available]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    return columns
+
+def read_columnar_range(file_path: str, offset: int, limit: int, columns: Optional[List[str]] = None):
+    """Return (columns, total_rows, DataFrame) for a row range of a Parquet or Arrow file.
+
+    Row counts come from file metadata and only the row groups / record
+    batches overlapping the range are read, restricted to the requested columns.
+    """
+    import pyarrow as pa
+    
+    if file_path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        
+        pf = pq.ParquetFile(file_path)
+        all_columns = pf.schema_arrow.names
+        columns = check_columns(all_columns, columns)
+        total_rows = pf.metadata.num_rows
+        
+        groups = []
+        first_row = None
+        group_start = 0
+        for i in range(pf.num_row_groups):
+            group_rows = pf.metadata.row_group(i).num_rows
+            if group_start + group_rows > offset and group_start < offset + limit:
+                groups.append(i)
+                first_row = group_start if first_row is None else first_row
+            group_start += group_rows
+        
+        if groups:
+            table = pf.read_row_groups(groups, columns=columns).slice(offset - first_row, limit)
+        else:
+            table = pf.schema_arrow.empty_table().select(columns or all_columns)
+    else:
+        reader = pa.ipc.open_file(pa.memory_map(file_path, 'r'))
+        all_columns = reader.schema.names
+        columns = check_columns(all_columns, columns)
+        metadata = reader.schema.metadata or {}
+        # Fixed-size batches let us jump straight to the right one. Files from before
+        # autodw.fixed_batch_rows may have uneven batches, so they are walked from the start
+        batch_rows = int(metadata.get(b"autodw.fixed_batch_rows", 0)) or None
+        last_batch = reader.num_record_batches - 1
+        if b"autodw.num_rows" in metadata:
+            total_rows = int(metadata[b"autodw.num_rows"])
+        elif batch_rows and last_batch >= 0:
+            total_rows = last_batch * batch_rows + reader.get_batch(last_batch).num_rows
+        else:
+            total_rows = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+        
+        first_batch = min(offset // batch_rows, reader.num_record_batches) if batch_rows else 0
+        batch_start = first_batch * batch_rows if batch_rows else 0
+        
+        batches = []
+        for i in range(first_batch, reader.num_record_batches):
+            if batch_start >= offset + limit:
+                break
+            batch = reader.get_batch(i)
+            if batch_start + batch.num_rows > offset:
+                if not batches:
+                    first_row = batch_start
+                batches.append(batch.select(columns) if columns else batch)
+            batch_start += batch.num_rows
+        
+        if batches:
+            table = pa.Table.from_batches(batches).slice(offset - first_row, limit)
+        else:
+            table = reader.schema.empty_table().select(columns or all_columns)
+    
+    return columns or all_columns, total_rows, table.to_pandas()
+
+def read_csv_range(file_path: str, offset: int, limit: int, columns: Optional[List[str]] = None):
+    """Return (columns, total_rows, DataFrame) for a row range of a CSV table.
+
+    Uses the table's row-offset index to seek near the first requested row, so
+    cost depends on the page size rather than the file size.
+    """
+    index = load_row_index(file_path)
+    
+    if index is None:
+        # Tables written before the index existed: stream-count rows, skip to the range
+        all_columns = [str(c) for c in pd.read_csv(file_path, nrows=0).columns]
+        columns = check_columns(all_columns, columns)
+        stats = CsvStreamStats()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+                stats.feed(chunk)
+        total_rows = max(stats.total_records - 1, 0)
+        df = pd.read_csv(file_path, skiprows=range(1, offset + 1), nrows=limit, usecols=columns)
+    else:
+        all_columns = index["columns"]
+        columns = check_columns(all_columns, columns)
+        total_rows = index["rows"]
+        
+        if offset >= total_rows or not index["offsets"]:
+            df = pd.DataFrame(columns=columns or all_columns)
+        else:
+            block = offset // index["stride"]
+            with open(file_path, 'rb') as f:
+                f.seek(index["offsets"][block])
+                df = pd.read_csv(f, header=None, names=all_columns, usecols=columns,
+                                 skiprows=offset - block * index["stride"], nrows=limit)
+    
+    if columns:
+        df = df[columns]
+    return columns or all_columns, total_rows, df
+
+def read_preview(file_path: str, file_name: str, offset: int = 0, limit: int = 10,
+                 columns: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Build the preview payload for a row range of a generated project file"""
+    if file_name.endswith(('.parquet', '.feather', '.csv')):
+        if file_name.endswith('.csv'):
+            columns, total_rows, df = read_csv_range(file_path, offset, limit, columns)
+        else:
+            columns, total_rows, df = read_columnar_range(file_path, offset, limit, columns)
+        return {
+            "file_name": file_name,
+            "file_type": file_name.rsplit('.', 1)[1],
+            "columns": columns,
+            "total_rows": total_rows,
+            "offset": offset,
+            "limit": limit,
+            "preview_data": df.to_dict(orient='records')
+        }
+    else:
+        # For text files
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        return {
+            "file_name": file_name,
+            "file_type": "text",
+            "content": content[:2000]  # First 2000 characters
+        }
+
+# PDF EXTRACTION
+
+def pdf_cache_dir(digest: str) -> str:
+    return os.path.join(PDF_CACHE_DIR, digest)
+
+def read_cached_page(digest: str, page_number: int) -> Optional[str]:
+    try:
+        with open(os.path.join(pdf_cache_dir(digest), f"{page_number:06d}.txt"), 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
+
+def cache_page(digest: str, page_number: int, text: str):
+    """Store extracted page text; written atomically so parallel workers never see partial pages"""
+    cache_dir = pdf_cache_dir(digest)
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{page_number:06d}.txt")
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def pdf_page_count(file_path: str, digest: str) -> int:
+    """Number of pages in a PDF, cached alongside its page text"""
+    meta_path = os.path.join(pdf_cache_dir(digest), "pages.json")
+    try:
+        with open(meta_path, 'r') as f:
+            return json.load(f)["page_count"]
+    except (OSError, ValueError, KeyError):
+        pass
+    
+    with pdfplumber.open(file_path) as pdf:
+        page_count = len(pdf.pages)
+    os.makedirs(pdf_cache_dir(digest), exist_ok=True)
+    tmp_path = f"{meta_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"page_count": page_count}, f)
+    os.replace(tmp_path, meta_path)
+    return page_count
+
+def missing_pdf_pages(file_path: str, digest: str) -> List[int]:
+    """Page numbers of a PDF that are not in the page cache yet"""
+    return [p for p in range(pdf_page_count(file_path, digest)) if read_cached_page(digest, p) is None]
+
+def extract_pdf_pages(file_path: str, digest: str, pages: List[int]) -> int:
+    """Extract and cache a batch of pages (runs on the worker pool), skipping cached ones"""
+    extracted = 0
+    with stage_timer("pdf_extract") as sizes, pdfplumber.open(file_path) as pdf:
+        for page_number in pages:
+            if read_cached_page(digest, page_number) is not None:
+                continue
+            cache_page(digest, page_number, pdf.pages[page_number].extract_text() or "")
+            extracted += 1
+        sizes["rows"] = extracted
+    return extracted
+
+def iter_pdf_pages(file_path: str, digest: str):
+    """Yield page text in order, from the cache where possible"""
+    pdf = None
+    try:
+        for page_number in range(pdf_page_count(file_path, digest)):
+            text = read_cached_page(digest, page_number)
+            if text is None:
+                if pdf is None:
+                    pdf = pdfplumber.open(file_path)
+                text = pdf.pages[page_number].extract_text() or ""
+                cache_page(digest, page_number, text)
+            yield text
+    finally:
+        if pdf is not None:
+            pdf.close()
+
+def iter_pdf_rows(file_path: str, digest: str):
+    """Stream the line_number/content/word_count rows of a PDF page by page"""
+    line_number = 0
+    for page_text in iter_pdf_pages(file_path, digest):
+        for line in page_text.split("\n"):
+            line = line.strip()
+            if line:
+                line_number += 1
+                yield {
+                    "line_number": line_number,
+                    "content": line,
+                    "word_count": len(line.split())
+                }
+
+def pdf_preview(file_path: str, digest: str, max_lines: int = 20):
+    """Extract the first lines of a PDF, stopping as soon as enough text is found"""
+    return list(itertools.islice(iter_pdf_rows(file_path, digest), max_lines))
+
+async def extract_pdf(file_path: str, digest: str) -> int:
+    """Extract every uncached page of a PDF in parallel batches across the worker pool"""
+    missing = await run_in_pool(missing_pdf_pages, file_path, digest, reject_when_full=False)
+    batches = [missing[i:i + PDF_PAGES_PER_TASK] for i in range(0, len(missing), PDF_PAGES_PER_TASK)]
+    
+    extracted = await asyncio.gather(*[
+        run_in_pool(extract_pdf_pages, file_path, digest, batch, reject_when_full=False) for batch in batches
+    ])
+    return sum(extracted)
+
+async def warm_pdf_cache(file_path: str, digest: str):
+    """Background job: extract the rest of an uploaded PDF so the build finds it cached"""
+    try:
+        await extract_pdf(file_path, digest)
+    except Exception as e:
+        print(f"PDF extraction error for {file_path}: {e}")
+
+# UPLOAD STATS CACHE
+
+def get_cached_file_stats(name: str, size: int, mtime: float) -> Optional[Dict[str, Any]]:
+    """Return cached stats for an upload if it hasn't changed since they were computed"""
+    entry = _files_cache.get(name)
+    if entry is None or entry["size"] != size or entry["mtime"] != mtime:
+        return None
+    _files_cache.move_to_end(name)
+    return entry
+
+def cache_file_stats(name: str, size: int, mtime: float, rows: int, columns: int):
+    """Store exact stats for an upload, evicting the least recently used entries"""
+    _files_cache[name] = {"size": size, "mtime": mtime, "rows": rows, "columns": columns}
+    _files_cache.move_to_end(name)
+    while len(_files_cache) > FILES_CACHE_SIZE:
+        _files_cache.popitem(last=False)
+
+def share_file_stats(name: str, size: int, mtime: float, rows: int, columns: int):
+    """Publish exact upload stats to the metadata index for the other server workers"""
+    conn = metadata_db()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO upload_stats (name, size, mtime, rows, columns) VALUES (?, ?, ?, ?, ?)",
+                (name, size, mtime, rows, columns)
+            )
+    finally:
+        conn.close()
+
+def load_shared_file_stats(names: List[str]) -> List[Dict[str, Any]]:
+    """Upload stats other server workers computed; callers still validate size and mtime"""
+    conn = metadata_db()
+    try:
+        entries = []
+        for start in range(0, len(names), 500):
+            batch = names[start:start + 500]
+            entries.extend(dict(row) for row in conn.execute(
+                f"SELECT name, size, mtime, rows, columns FROM upload_stats WHERE name IN ({','.join('?' * len(batch))})",
+                batch
+            ))
+        return entries
+    finally:
+        conn.close()
+
+async def remember_file_stats(name: str, size: int, mtime: float, rows: int, columns: int):
+    """Cache exact upload stats in this process and share them with the other server workers"""
+    cache_file_stats(name, size, mtime, rows, columns)
+    try:
+        await run_in_threadpool(share_file_stats, name, size, mtime, rows, columns)
+    except Exception as e:
+        print(f"Could not share stats for {name}: {e}")
+
+def pdf_stats(size: int):
+    """PDF row/column counts are estimated from the file size"""
+    return min(size // 1000, 1000), 3  # Standard PDF processing columns
+
+def stat_upload_files() -> List[Dict[str, Any]]:
+    """List uploaded CSV/PDF files with their size and mtime"""
+    files = []
+    if os.path.exists(UPLOAD_DIR):
+        for f in os.listdir(UPLOAD_DIR):
+            if f.endswith(('.csv', '.pdf')):
+                try:
+                    st = os.stat(os.path.join(UPLOAD_DIR, f))
+                except OSError:
+                    continue
+                files.append({"name": f, "size": st.st_size, "mtime": st.st_mtime})
+    return files
+
+def estimate_csv_stats(name: str, size: int):
+    """Estimate rows from the average line length of the first 64 KB, and read the header"""
+    file_path = os.path.join(UPLOAD_DIR, name)
+    with open(file_path, 'rb') as f:
+        head = f.read(64 * 1024)
+    col_count = len(pd.read_csv(io.BytesIO(head), nrows=0).columns)
+    lines = head.count(b"\n")
+    if len(head) >= size or lines == 0:
+        return max(lines - 1 + (1 if head and not head.endswith(b"\n") else 0), 0), col_count
+    return max(int(size / (len(head) / lines)) - 1, 0), col_count
+
+def count_csv_stats(name: str) -> Dict[str, Any]:
+    """Exact row and column counts for an uploaded CSV, streamed in constant memory"""
+    file_path = os.path.join(UPLOAD_DIR, name)
+    st = os.stat(file_path)
+    stats = CsvStreamStats()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            stats.feed(chunk)
+    rows, columns, _ = stats.result()
+    return {"size": st.st_size, "mtime": st.st_mtime, "rows": rows, "columns": len(columns)}
+
+async def fill_file_stats(names: List[str]):
+    """Compute exact stats for uncached uploads in the background"""
+    try:
+        for name in names:
+            try:
+                stats = await run_in_pool(count_csv_stats, name, reject_when_full=False)
+                await remember_file_stats(name, **stats)
+            except Exception as e:
+                print(f"Error counting rows in {name}: {e}")
+    finally:
+        _files_pending.difference_update(names)
+
+# UPLOAD STORE
+
+def blob_path(digest: str) -> str:
+    return os.path.join(UPLOAD_OBJECTS_DIR, digest[:2], digest)
+
+def link_upload(blob: str, file_path: str):
+    """Atomically point an upload name at a stored blob"""
+    tmp_path = f"{file_path}.{uuid.uuid4().hex}.link"
+    try:
+        os.link(blob, tmp_path)
+    except OSError:
+        shutil.copyfile(blob, tmp_path)  # Filesystems without hard links
+    os.replace(tmp_path, file_path)
+
+def release_blob(conn: sqlite3.Connection, digest: str):
+    """Drop one reference to a blob, deleting it and its PDF page cache once nothing points at it
+    (caller owns the transaction)"""
+    conn.execute("UPDATE upload_blobs SET refcount = refcount - 1 WHERE hash = ?", (digest,))
+    if conn.execute("SELECT 1 FROM upload_blobs WHERE hash = ? AND refcount <= 0", (digest,)).fetchone():
+        conn.execute("DELETE FROM upload_blobs WHERE hash = ?", (digest,))
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(blob_path(digest))
+        shutil.rmtree(pdf_cache_dir(digest), ignore_errors=True)
+
+def store_upload(tmp_path: str, name: str, digest: str, size: int) -> Optional[Dict[str, Any]]:
+    """Move a streamed upload into the content store and map name -> hash.
+
+    Uploads are stored once per content hash in data/uploads/.objects and hard
+    linked under their file name, so identical files cost no extra disk. A name
+    that pointed at other content releases its reference to it. Returns the
+    rows/columns/preview recorded when this content was first parsed, or None
+    if it still needs parsing.
+    """
+    blob = blob_path(digest)
+    file_path = os.path.join(UPLOAD_DIR, name)
+    conn = metadata_db()
+    try:
+        # Serializes store updates across server workers
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT result FROM upload_blobs WHERE hash = ?", (digest,)).fetchone()
+            if not os.path.exists(blob):
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                os.replace(tmp_path, blob)
+            if row is None:
+                conn.execute("INSERT INTO upload_blobs (hash, size, refcount) VALUES (?, ?, 0)", (digest, size))
+            
+            old = conn.execute("SELECT hash FROM upload_names WHERE name = ?", (name,)).fetchone()
+            if old is None or old["hash"] != digest or not os.path.exists(file_path):
+                link_upload(blob, file_path)
+            if old is None or old["hash"] != digest:
+                conn.execute("INSERT OR REPLACE INTO upload_names (name, hash) VALUES (?, ?)", (name, digest))
+                conn.execute("UPDATE upload_blobs SET refcount = refcount + 1 WHERE hash = ?", (digest,))
+                if old is not None:
+                    release_blob(conn, old["hash"])
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        
+        return json.loads(row["result"]) if row is not None and row["result"] else None
+    finally:
+        conn.close()
+
+def save_upload_result(digest: str, result: Dict[str, Any]):
+    """Remember an upload's parse result so duplicates of it skip parsing"""
+    conn = metadata_db()
+    try:
+        with conn:
+            conn.execute("UPDATE upload_blobs SET result = ? WHERE hash = ?", (json.dumps(result, default=str), digest))
+    finally:
+        conn.close()
+
+def remove_upload(name: str) -> bool:
+    """Delete an upload name, and its content once no other name refers to it"""
+    file_path = os.path.join(UPLOAD_DIR, name)
+    conn = metadata_db()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            old = conn.execute("SELECT hash FROM upload_names WHERE name = ?", (name,)).fetchone()
+            existed = os.path.exists(file_path)
+            if existed:
+                os.remove(file_path)
+            if old is not None:
+                conn.execute("DELETE FROM upload_names WHERE name = ?", (name,))
+                release_blob(conn, old["hash"])
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return existed or old is not None
+    finally:
+        conn.close()
+
+def upload_hashes(files: List[str]) -> Dict[str, str]:
+    """Content hashes recorded at upload time, for names still linked to their stored blob"""
+    conn = metadata_db()
+    try:
+        rows = []
+        for start in range(0, len(files), 500):
+            batch = files[start:start + 500]
+            rows.extend(conn.execute(
+                f"SELECT name, hash FROM upload_names WHERE name IN ({','.join('?' * len(batch))})", batch
+            ).fetchall())
+    finally:
+        conn.close()
+    
+    hashes = {}
+    for row in rows:
+        try:
+            if os.path.samefile(os.path.join(UPLOAD_DIR, row["name"]), blob_path(row["hash"])):
+                hashes[row["name"]] = row["hash"]
+        except OSError:
+            continue
+    return hashes
+
+# PROJECT METADATA INDEX
+
+def summarize_project(project_id: str) -> Dict[str, Any]:
+    """Read summary data for one built project from its directory and README"""
+    project_path = os.path.join(OUTPUT_DIR, f"project_{project_id}")
+    files = [f for f in os.listdir(project_path) if not f.startswith('.')]
+    
+    # Count fact and dimension tables
+    fact_tables = []
+    dim_tables = []
+    total_size = 0
+    
+    for file in files:
+        file_path = os.path.join(project_path, file)
+        if os.path.isfile(file_path):
+            total_size += os.path.getsize(file_path) / (1024 * 1024)  # MB
+            
+            if file.startswith("fact_"):
+                fact_tables.append(file)
+            elif file.startswith("dim_"):
+                dim_tables.append(file)
+        elif os.path.isdir(file_path) and file.startswith("fact_"):
+            # Partitioned fact table: a directory of <key>=<value>/part-NNNNN files
+            for root, dirs, names in os.walk(file_path):
+                dirs[:] = [d for d in dirs if not d.startswith('.')]
+                total_size += sum(os.path.getsize(os.path.join(root, n)) for n in names) / (1024 * 1024)
+            fact_tables.append(file)
+    
+    # Extract project name from README if available, with deduplication handling
+    base_name = project_id[:15]  # Use first part of ID
+    project_name = base_name.replace('_', ' ').title()
+    
+    # Add timestamp to make names unique
+    if '_' in project_id:
+        timestamp_part = project_id.split('_')[0] if len(project_id.split('_')) > 1 else ''
+        if timestamp_part and len(timestamp_part) >= 12:  # YYYYMMDDHHMMSS format
+            try:
+                date_obj = datetime.strptime(timestamp_part, "%Y%m%d%H%M%S")
+                formatted_date = date_obj.strftime("%m/%d %H:%M")
+                project_name = f"{base_name} ({formatted_date})"
+            except:
+                pass
+    
+    built_at = "2024-01-01"  # Default
+    
+    readme_path = os.path.join(project_path, "README.txt")
+    if os.path.exists(readme_path):
+        try:
+            with open(readme_path, 'r') as f:
+                content = f.read()
+                for line in content.split('\n'):
+                    if line.startswith('Project Name:'):
+                        project_name = line.replace('Project Name:', '').strip()
+                    elif line.startswith('Date:'):
+                        built_at = line.replace('Date:', '').strip()
+        except:
+            pass
+    
+    return {
+        "project_id": project_id,
+        "project_name": project_name,
+        "created_at": built_at.split(' ')[0],  # Just the date part
+        "built_at": built_at,
+        "fact_tables": fact_tables,
+        "dimension_tables": dim_tables,
+        "fact_tables_count": len(fact_tables),
+        "dim_tables_count": len(dim_tables),
+        "total_size_mb": round(total_size, 2),
+        "file_count": len(files)
+    }
+
+def scan_projects() -> List[Dict[str, Any]]:
+    """Read summary data for every built project from the output directory"""
+    projects = []
+    
+    if os.path.exists(OUTPUT_DIR):
+        for item in os.listdir(OUTPUT_DIR):
+            if item.startswith("project_") and len(item) > 8:
+                project_id = item[8:]  # Remove prefix
+                try:
+                    projects.append(summarize_project(project_id))
+                except Exception as e:
+                    print(f"Error processing project {project_id}: {e}")
+                    # Skip this project and continue
+                    continue
+    
+    return projects
+
+def metadata_db() -> sqlite3.Connection:
+    """Open the project metadata index, creating and backfilling it on first use"""
+    global _metadata_ready
+    conn = sqlite3.connect(METADATA_DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    
+    if not _metadata_ready:
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS projects (
+                    project_id TEXT PRIMARY KEY,
+                    project_name TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    built_at TEXT NOT NULL,
+                    fact_tables TEXT NOT NULL,
+                    dimension_tables TEXT NOT NULL,
+                    fact_tables_count INTEGER NOT NULL,
+                    dim_tables_count INTEGER NOT NULL,
+                    total_size_mb REAL NOT NULL,
+                    file_count INTEGER NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_built_at ON projects (built_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_name ON projects (project_name)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS upload_stats (
+                    name TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    rows INTEGER NOT NULL,
+                    columns INTEGER NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS upload_blobs (
+                    hash TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    refcount INTEGER NOT NULL,
+                    result TEXT
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS upload_names (
+                    name TEXT PRIMARY KEY,
+                    hash TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS partitions (
+                    project_id TEXT NOT NULL,
+                    table_name TEXT NOT NULL,
+                    partition_key TEXT NOT NULL,
+                    partition_kind TEXT NOT NULL,
+                    partition_value TEXT NOT NULL,
+                    file TEXT NOT NULL,
+                    rows INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    created_at TEXT NOT NULL,
+                    PRIMARY KEY (project_id, file)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_partitions_value ON partitions "
+                         "(project_id, table_name, partition_value)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    revision INTEGER NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    data TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS relationships (
+                    from_project TEXT NOT NULL,
+                    from_table TEXT NOT NULL,
+                    from_column TEXT NOT NULL,
+                    to_project TEXT NOT NULL,
+                    to_table TEXT NOT NULL,
+                    to_column TEXT NOT NULL,
+                    containment REAL NOT NULL,
+                    name_match INTEGER NOT NULL
+                )
+            """)
+            
+            # Index projects built before the metadata store existed
+            if conn.execute("SELECT COUNT(*) FROM projects").fetchone()[0] == 0:
+                write_project_rows(conn, scan_projects())
+        _metadata_ready = True
+    
+    return conn
+
+def write_project_rows(conn: sqlite3.Connection, summaries: List[Dict[str, Any]]):
+    """Insert or replace project summaries (caller owns the transaction)"""
+    conn.executemany("""
+        INSERT OR REPLACE INTO projects (project_id, project_name, created_at, built_at,
+            fact_tables, dimension_tables, fact_tables_count, dim_tables_count, total_size_mb, file_count)
+        VALUES (:project_id, :project_name, :created_at, :built_at,
+            :fact_tables, :dimension_tables, :fact_tables_count, :dim_tables_count, :total_size_mb, :file_count)
+    """, [
+        {**p, "fact_tables": json.dumps(p["fact_tables"]), "dimension_tables": json.dumps(p["dimension_tables"])}
+        for p in summaries
+    ])
+
+def update_project_index(summaries: List[Dict[str, Any]], removed_ids: List[str] = ()):
+    """Apply a build's added and removed projects to the index in one transaction"""
+    conn = metadata_db()
+    try:
+        with conn:
+            conn.executemany("DELETE FROM projects WHERE project_id = ?", [(p,) for p in removed_ids])
+            conn.executemany("DELETE FROM relationships WHERE from_project = ? OR to_project = ?",
+                             [(p, p) for p in removed_ids])
+            conn.executemany("DELETE FROM partitions WHERE project_id = ?", [(p,) for p in removed_ids])
+            write_project_rows(conn, summaries)
+    finally:
+        conn.close()
+
+def query_projects(search: Optional[str] = None, sort: str = "built_at", order: str = "desc",
+                   limit: int = 50, offset: int = 0):
+    """Return (projects, total) for one page of the project index"""
+    where = ""
+    params: List[Any] = []
+    if search:
+        where = "WHERE project_name LIKE ? OR project_id LIKE ?"
+        params = [f"%{search}%", f"%{search}%"]
+    
+    conn = metadata_db()
+    try:
+        total = conn.execute(f"SELECT COUNT(*) FROM projects {where}", params).fetchone()[0]
+        # sort/order are validated against PROJECT_SORT_FIELDS by the caller
+        rows = conn.execute(
+            f"SELECT * FROM projects {where} ORDER BY {sort} {order}, project_id LIMIT ? OFFSET ?",
+            params + [limit, offset]
+        ).fetchall()
+    finally:
+        conn.close()
+    
+    projects = []
+    for row in rows:
+        project = dict(row)
+        project["fact_tables"] = json.loads(project["fact_tables"])
+        project["dimension_tables"] = json.loads(project["dimension_tables"])
+        projects.append(project)
+    return projects, total
+
+# RELATIONSHIP DISCOVERY
+
+def sketch_column(values: pd.Series) -> Dict[str, Any]:
+    """Bottom-k sketch of a column: the SKETCH_SIZE smallest 64-bit hashes of its distinct values.
+
+    The sketch estimates the distinct count (exact when it holds fewer than
+    SKETCH_SIZE hashes) and how many values two columns share, without keeping
+    the data around. Integral floats hash like ints so 1.0 matches 1.
+    """
+    values = values.dropna()
+    kind = "text"
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        if len(values) == 0 or (values % 1 == 0).all():
+            kind = "integer"
+            values = values.astype('int64')
+        else:
+            kind = "float"
+    
+    hashes = pd.unique(pd.util.hash_array(np.asarray(values.astype(str), dtype=object)))
+    if len(hashes) > SKETCH_SIZE:
+        hashes = np.partition(hashes, SKETCH_SIZE - 1)[:SKETCH_SIZE]
+    return finish_sketch(kind, np.sort(hashes))
+
+def finish_sketch(kind: str, hashes: np.ndarray) -> Dict[str, Any]:
+    if len(hashes) < SKETCH_SIZE:
+        distinct = len(hashes)
+    else:
+        # KMV estimate from the k-th smallest normalized hash
+        distinct = int((SKETCH_SIZE - 1) / (float(hashes[-1]) / 2 ** 64))
+    
+    return {"kind": kind, "distinct": distinct, "hashes": [int(h) for h in hashes]}
+
+def merge_column_sketches(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine sketches of two chunks of a column by keeping the k smallest hashes of both"""
+    hashes = np.union1d(np.array(a["hashes"], dtype=np.uint64),
+                        np.array(b["hashes"], dtype=np.uint64))[:SKETCH_SIZE]
+    kinds = {a["kind"], b["kind"]}
+    kind = kinds.pop() if len(kinds) == 1 else ("float" if kinds == {"integer", "float"} else "text")
+    return finish_sketch(kind, hashes)
+
+def save_index_json(project_dir: str, name: str, data: Dict[str, Any]):
+    """Write a build artifact to the project's hidden .index directory"""
+    index_dir = os.path.join(project_dir, ".index")
+    os.makedirs(index_dir, exist_ok=True)
+    with open(os.path.join(index_dir, name), 'w') as f:
+        json.dump(data, f, default=str)
+
+def load_sketches(project_id: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(OUTPUT_DIR, f"project_{project_id}", ".index", "sketches.json"), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def sketch_containment(a: np.ndarray, b: np.ndarray, b_exact: bool) -> float:
+    """Estimated share of column A's distinct values that also occur in column B.
+
+    Both sketches hold the smallest hashes of their columns, so A's hashes up to
+    B's largest kept hash are a uniform sample that can be checked against B.
+    """
+    if not b_exact:
+        a = a[a <= b[-1]]
+    if len(a) == 0:
+        return 0.0
+    return float(np.isin(a, b).mean())
+
+def name_stem(name: str) -> str:
+    """Column or table name without dim_/fact_ prefixes and id/key/code suffixes"""
+    name = name.lower()
+    for prefix in ("dim_", "fact_"):
+        if name.startswith(prefix):
+            name = name[len(prefix):]
+    for suffix in ("_id", "_key", "_code", "id", "s"):
+        if name.endswith(suffix) and len(name) > len(suffix):
+            name = name[:-len(suffix)]
+    return name.strip('_')
+
+def names_match(fact_column: str, dim_table: str, dim_column: str) -> bool:
+    stem = name_stem(fact_column)
+    return stem in (name_stem(dim_column), name_stem(dim_table)) or fact_column.lower() == dim_column.lower()
+
+def discover_relationships(project_ids: List[str]) -> List[Dict[str, Any]]:
+    """Propose foreign keys from fact columns to dimension keys in other projects.
+
+    Dimension key candidates are columns that are (nearly) unique in their
+    table. A fact column links to one when at least FK_MIN_CONTAINMENT of its
+    values appear in the key. Integer columns also need matching names, since
+    unrelated 1..n id ranges contain each other. Cost is linear in the number
+    of columns per comparison, never in the number of rows.
+    """
+    facts = []
+    keys = []
+    for project_id in project_ids:
+        for table, sketch in load_sketches(project_id).items():
+            for column, col in sketch["columns"].items():
+                entry = (project_id, table, column, col["kind"], col["distinct"],
+                         np.array(col["hashes"], dtype=np.uint64), len(col["hashes"]) < SKETCH_SIZE)
+                if sketch["role"] == "fact" and col["kind"] != "float" and col["distinct"] > 1:
+                    facts.append(entry)
+                elif (sketch["role"] == "dimension" and col["kind"] != "float" and col["distinct"] > 1
+                      and col["distinct"] >= KEY_MIN_UNIQUENESS * sketch["rows"]):
+                    keys.append(entry)
+    
+    links = []
+    for f_project, f_table, f_column, f_kind, f_distinct, f_hashes, _ in facts:
+        best = None
+        for d_project, d_table, d_column, d_kind, d_distinct, d_hashes, d_exact in keys:
+            if d_project == f_project or d_kind != f_kind:
+                continue
+            # A contained column can't have many more distinct values than the key
+            if f_distinct * FK_MIN_CONTAINMENT > d_distinct * 1.1:
+                continue
+            matched_names = names_match(f_column, d_table, d_column)
+            if f_kind == "integer" and not matched_names:
+                continue
+            
+            containment = sketch_containment(f_hashes, d_hashes, d_exact)
+            if containment < FK_MIN_CONTAINMENT:
+                continue
+            score = (containment, matched_names, -abs(d_distinct - f_distinct))
+            if best is None or score > best[0]:
+                best = (score, d_project, d_table, d_column)
+        
+        if best is not None:
+            (containment, matched_names, _), d_project, d_table, d_column = best
+            links.append({
+                "from_project": f_project,
+                "from_table": f_table,
+                "from_column": f_column,
+                "to_project": d_project,
+                "to_table": d_table,
+                "to_column": d_column,
+                "containment": round(containment, 3),
+                "name_match": matched_names
+            })
+    
+    return links
+
+def save_relationships(links: List[Dict[str, Any]]):
+    """Replace the discovered relationships in the metadata index"""
+    conn = metadata_db()
+    try:
+        with conn:
+            conn.execute("DELETE FROM relationships")
+            conn.executemany("""
+                INSERT INTO relationships (from_project, from_table, from_column,
+                    to_project, to_table, to_column, containment, name_match)
+                VALUES (:from_project, :from_table, :from_column,
+                    :to_project, :to_table, :to_column, :containment, :name_match)
+            """, links)
+    finally:
+        conn.close()
+
+def query_relationships(project_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    conn = metadata_db()
+    try:
+        if project_id:
+            rows = conn.execute(
+                "SELECT * FROM relationships WHERE from_project = ? OR to_project = ? ORDER BY containment DESC",
+                (project_id, project_id)
+            ).fetchall()
+        else:
+            rows = conn.execute("SELECT * FROM relationships ORDER BY containment DESC").fetchall()
+    finally:
+        conn.close()
+    return [{**dict(row), "name_match": bool(row["name_match"])} for row in rows]
+
+def refresh_relationships(project_ids: List[str]) -> int:
+    """Rediscover cross-project relationships and store them (runs on the worker pool)"""
+    links = discover_relationships(project_ids)
+    save_relationships(links)
+    return len(links)
+
+# TABLE PROFILES
+
+def json_value(value):
+    """Plain Python value for numpy scalars, so profiles serialize as JSON"""
+    return value.item() if isinstance(value, np.generic) else value
+
+def update_histogram(histogram: Optional[Dict[str, Any]], numbers: np.ndarray) -> Dict[str, Any]:
+    """Add finite values to an equal-width histogram, doubling the bin width until they fit.
+
+    Doubling merges neighbouring bins, so counts stay exact while the range
+    grows to cover every chunk.
+    """
+    bins = PROFILE_HISTOGRAM_BINS
+    low, high = float(numbers.min()), float(numbers.max())
+    if histogram is None:
+        histogram = {"start": low, "width": (high - low) / bins or 1.0,
+                     "counts": np.zeros(bins, dtype=np.int64)}
+    start, width, counts = histogram["start"], histogram["width"], histogram["counts"]
+    
+    # The top edge is inclusive: the maximum lands in the last bin
+    while low < start or high > start + width * bins:
+        merged = counts.reshape(-1, 2).sum(axis=1)
+        empty = np.zeros(bins // 2, dtype=np.int64)
+        if low < start:
+            counts = np.concatenate([empty, merged])
+            start -= width * bins
+        else:
+            counts = np.concatenate([merged, empty])
+        width *= 2
+    
+    positions = np.clip(((numbers - start) / width).astype(np.int64), 0, bins - 1)
+    counts = counts + np.bincount(positions, minlength=bins)
+    return {"start": start, "width": width, "counts": counts}
+
+class TableProfiler:
+    """Column statistics of a generated table, merged chunk by chunk as it is written.
+
+    Tracks null counts, numeric min/max and histograms, the most frequent
+    values of non-float columns, and a bottom-k sketch per column that gives
+    the approximate distinct count and feeds relationship discovery.
+    """
+
+    def __init__(self, role: str, skip: List[str] = ()):
+        self.role = role
+        self.skip = set(skip)  # Surrogate keys: profiled, but not relationship candidates
+        self.rows = 0
+        self.columns = {}
+
+    def update(self, df: pd.DataFrame):
+        self.rows += len(df)
+        for col in df.columns:
+            values = df[col]
+            state = self.columns.setdefault(str(col), {
+                "dtype": str(values.dtype), "nulls": 0, "sketch": None,
+                "min": None, "max": None, "histogram": None, "top": None
+            })
+            state["nulls"] += int(values.isna().sum())
+            
+            sketch = sketch_column(values)
+            state["sketch"] = sketch if state["sketch"] is None else merge_column_sketches(state["sketch"], sketch)
+            
+            present = values.dropna()
+            if (pd.api.types.is_numeric_dtype(present) and not pd.api.types.is_bool_dtype(present)
+                    and len(present)):
+                numbers = present.to_numpy(dtype='float64')
+                numbers = numbers[np.isfinite(numbers)]
+                if len(numbers):
+                    if pd.api.types.is_integer_dtype(present):
+                        low, high = int(present.min()), int(present.max())
+                    else:
+                        low, high = float(numbers.min()), float(numbers.max())
+                    state["min"] = low if state["min"] is None else min(state["min"], low)
+                    state["max"] = high if state["max"] is None else max(state["max"], high)
+                    state["histogram"] = update_histogram(state["histogram"], numbers)
+            
+            if state["sketch"]["kind"] != "float":
+                counts = present.value_counts()
+                counts = counts[counts > 0]  # Categoricals count unused categories too
+                counts.index = counts.index.astype(object)
+                top = counts if state["top"] is None else state["top"].add(counts, fill_value=0)
+                state["top"] = top.nlargest(PROFILE_TOP_CAPACITY)
+
+    def state(self) -> Dict[str, Any]:
+        """The merged statistics as plain JSON values, to be resumed with from_state"""
+        columns = {}
+        for col, state in self.columns.items():
+            column = dict(state)
+            if state["histogram"] is not None:
+                column["histogram"] = dict(state["histogram"], counts=[int(c) for c in state["histogram"]["counts"]])
+            if state["top"] is not None:
+                column["top"] = [[json_value(value), int(count)] for value, count in state["top"].items()]
+            columns[col] = column
+        return {"role": self.role, "skip": sorted(self.skip), "rows": self.rows, "columns": columns}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> TableProfiler:
+        profiler = cls(state["role"], skip=state["skip"])
+        profiler.rows = state["rows"]
+        for col, column in state["columns"].items():
+            if column["histogram"] is not None:
+                column["histogram"]["counts"] = np.array(column["histogram"]["counts"], dtype=np.int64)
+            if column["top"] is not None:
+                column["top"] = pd.Series([count for _, count in column["top"]],
+                                          index=pd.Index([value for value, _ in column["top"]], dtype=object),
+                                          dtype='int64')
+            profiler.columns[col] = column
+        return profiler
+
+    def sketch(self) -> Dict[str, Any]:
+        """Table sketch for relationship discovery"""
+        return {
+            "role": self.role,
+            "rows": self.rows,
+            "columns": {col: state["sketch"] for col, state in self.columns.items() if col not in self.skip}
+        }
+
+    def profile(self) -> Dict[str, Any]:
+        columns = {}
+        for col, state in self.columns.items():
+            column = {
+                "dtype": state["dtype"],
+                "nulls": state["nulls"],
+                "null_ratio": round(state["nulls"] / self.rows, 4) if self.rows else 0.0,
+                "distinct": state["sketch"]["distinct"],
+                "distinct_exact": len(state["sketch"]["hashes"]) < SKETCH_SIZE,
+                "min": state["min"],
+                "max": state["max"]
+            }
+            if state["top"] is not None:
+                column["top_values"] = [
+                    {"value": json_value(value), "count": int(count)}
+                    for value, count in state["top"].head(PROFILE_TOP_K).items()
+                ]
+            if state["histogram"] is not None:
+                histogram = state["histogram"]
+                column["histogram"] = {
+                    "edges": [histogram["start"] + histogram["width"] * i
+                              for i in range(PROFILE_HISTOGRAM_BINS + 1)],
+                    "counts": [int(c) for c in histogram["counts"]]
+                }
+            columns[col] = column
+        return {"role": self.role, "rows": self.rows, "columns": columns}
+
+def profile_table(df: pd.DataFrame, role: str, skip: List[str] = ()) -> TableProfiler:
+    """Profile an in-memory table in CSV_CHUNK_ROWS slices"""
+    profiler = TableProfiler(role, skip)
+    with stage_timer("profile") as sizes:
+        for start in range(0, max(len(df), 1), CSV_CHUNK_ROWS):
+            profiler.update(df.iloc[start:start + CSV_CHUNK_ROWS])
+        sizes["rows"] = len(df)
+    return profiler
+
+def load_profile(project_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(OUTPUT_DIR, f"project_{project_id}", ".index", "profile.json"), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# PROJECT ARCHIVES
+
+def archive_files(project_dir: str, table: Optional[str] = None, since: Optional[str] = None,
+                  until: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Visible files of a project, in archive order, with their size and mtime.
+
+    Partitioned tables contribute their registered part files, pruned to
+    [since, until]; with table set only that table's files are included.
+    """
+    names = [
+        name for name in sorted(os.listdir(project_dir))
+        if not name.startswith('.') and os.path.isfile(os.path.join(project_dir, name))
+        and (table is None or os.path.splitext(name)[0] == table)
+    ]
+    project_id = os.path.basename(os.path.normpath(project_dir))[len("project_"):]
+    names += [part["file"] for part in load_partitions(project_id, table, since, until)]
+    
+    files = []
+    for name in names:
+        st = os.stat(os.path.join(project_dir, name))
+        files.append({"name": name, "size": st.st_size, "mtime": st.st_mtime})
+    return files
+
+def archive_etag(files: List[Dict[str, Any]]) -> str:
+    """Identifies one exact archive: same files, compression level and zlib produce the same bytes"""
+    key = json.dumps([[f["name"], f["size"], f["mtime"]] for f in files]
+                     + [ZIP_COMPRESSION_LEVEL, zlib.ZLIB_RUNTIME_VERSION])
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+def dos_datetime(mtime: float):
+    t = time.localtime(max(mtime, 315532800))  # Zip dates start in 1980
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+def zip_local_header(entry: Dict[str, Any]) -> bytes:
+    """Local file header; CRC and sizes follow the data in a Zip64 data descriptor"""
+    name = entry["name"].encode()
+    dos_time, dos_date = dos_datetime(entry["mtime"])
+    extra = struct.pack("<HHQQ", 0x0001, 16, 0, 0)
+    return struct.pack("<IHHHHHIIIHH", 0x04034b50, 45, 0x0808, 8, dos_time, dos_date,
+                       0, 0xFFFFFFFF, 0xFFFFFFFF, len(name), len(extra)) + name + extra
+
+def zip_data_descriptor(entry: Dict[str, Any]) -> bytes:
+    return struct.pack("<IIQQ", 0x08074b50, entry["crc"], entry["compressed_size"], entry["size"])
+
+def zip_central_directory(entries: List[Dict[str, Any]], offset: int) -> bytes:
+    """Central directory plus Zip64 and classic end records, for entries ending at offset"""
+    records = []
+    for entry in entries:
+        name = entry["name"].encode()
+        dos_time, dos_date = dos_datetime(entry["mtime"])
+        extra = struct.pack("<HHQQQ", 0x0001, 24, entry["size"], entry["compressed_size"], entry["offset"])
+        records.append(struct.pack(
+            "<IHHHHHHIIIHHHHHII", 0x02014b50, 0x032D, 45, 0x0808, 8, dos_time, dos_date, entry["crc"],
+            0xFFFFFFFF, 0xFFFFFFFF, len(name), len(extra), 0, 0, 0, 0o100644 << 16, 0xFFFFFFFF
+        ) + name + extra)
+    directory = b"".join(records)
+    
+    zip64_end = struct.pack("<IQHHIIQQQQ", 0x06064b50, 44, 45, 45, 0, 0,
+                            len(entries), len(entries), len(directory), offset)
+    locator = struct.pack("<IIQI", 0x07064b50, 0, offset + len(directory), 1)
+    end = struct.pack("<IHHHHIIH", 0x06054b50, 0, 0, 0xFFFF, 0xFFFF, 0xFFFFFFFF, 0xFFFFFFFF, 0)
+    return directory + zip64_end + locator + end
+
+def iter_compressed(file_path: str, entry: Optional[Dict[str, Any]] = None):
+    """Yield the raw deflate stream of a file, recording its CRC and sizes in entry"""
+    compressor = zlib.compressobj(ZIP_COMPRESSION_LEVEL, zlib.DEFLATED, -15)
+    crc = 0
+    size = 0
+    compressed = 0
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(ZIP_READ_SIZE), b""):
+            crc = zlib.crc32(block, crc)
+            size += len(block)
+            data = compressor.compress(block)
+            if data:
+                compressed += len(data)
+                yield data
+    data = compressor.flush()
+    compressed += len(data)
+    yield data
+    if entry is not None:
+        entry.update(crc=crc, size=size, compressed_size=compressed)
+
+def archive_layout_path(project_dir: str) -> str:
+    return os.path.join(project_dir, ".index", "archive.json")
+
+def load_archive_layout(project_dir: str, etag: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(archive_layout_path(project_dir), 'r') as f:
+            layout = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return layout if layout.get("etag") == etag else None
+
+def save_archive_layout(project_dir: str, etag: str, entries: List[Dict[str, Any]], size: int):
+    path = archive_layout_path(project_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"etag": etag, "size": size, "entries": entries}, f)
+    os.replace(tmp_path, path)
+
+def iter_project_zip(project_dir: str, files: List[Dict[str, Any]], etag: str):
+    """Stream a zip of the project as it is compressed, saving its layout at the end"""
+    offset = 0
+    entries = []
+    for file in files:
+        entry = {**file, "offset": offset}
+        header = zip_local_header(entry)
+        yield header
+        for data in iter_compressed(os.path.join(project_dir, file["name"]), entry):
+            yield data
+        descriptor = zip_data_descriptor(entry)
+        yield descriptor
+        offset += len(header) + entry["compressed_size"] + len(descriptor)
+        entries.append(entry)
+    
+    directory = zip_central_directory(entries, offset)
+    yield directory
+    save_archive_layout(project_dir, etag, entries, offset + len(directory))
+
+def archive_layout(project_dir: str, files: List[Dict[str, Any]], etag: str) -> Dict[str, Any]:
+    """Offsets, CRCs and compressed sizes of the project zip, compressing once if not cached (runs on the worker pool)"""
+    layout = load_archive_layout(project_dir, etag)
+    if layout is not None:
+        return layout
+    
+    offset = 0
+    entries = []
+    for file in files:
+        entry = {**file, "offset": offset}
+        for _ in iter_compressed(os.path.join(project_dir, file["name"]), entry):
+            pass
+        offset += len(zip_local_header(entry)) + entry["compressed_size"] + len(zip_data_descriptor(entry))
+        entries.append(entry)
+    
+    size = offset + len(zip_central_directory(entries, offset))
+    save_archive_layout(project_dir, etag, entries, size)
+    return {"etag": etag, "size": size, "entries": entries}
+
+def iter_zip_range(project_dir: str, layout: Dict[str, Any], start: int, end: int):
+    """Yield bytes start..end (inclusive) of a laid-out project zip.
+
+    Entries entirely outside the range are skipped without reading them; an
+    entry the range starts inside is recompressed from its beginning, which
+    reproduces the same bytes since compression is deterministic.
+    """
+    entries = layout["entries"]
+    parts = []
+    for entry in entries:
+        header = zip_local_header(entry)
+        parts.append((len(header), functools.partial(iter, [header])))
+        parts.append((entry["compressed_size"],
+                      functools.partial(iter_compressed, os.path.join(project_dir, entry["name"]))))
+        descriptor = zip_data_descriptor(entry)
+        parts.append((len(descriptor), functools.partial(iter, [descriptor])))
+    directory = zip_central_directory(entries, sum(length for length, _ in parts))
+    parts.append((len(directory), functools.partial(iter, [directory])))
+    
+    position = 0
+    for length, produce in parts:
+        part_start = position
+        position += length
+        if position <= start:
+            continue
+        if part_start > end:
+            break
+        for data in produce():
+            lo = max(start - part_start, 0)
+            hi = min(end + 1 - part_start, len(data))
+            if lo < hi:
+                yield data[lo:hi]
+            part_start += len(data)
+            if part_start > end:
+                break
+
+def parse_range(header: str, size: int):
+    """Parse a single "bytes=" range into (start, end); None if it can't be satisfied.
+
+    Raises ValueError for headers that aren't a single byte range, which are ignored.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        raise ValueError(f"Unsupported range: {header}")
+    first, _, last = spec.strip().partition("-")
+    if not first:
+        suffix = int(last)
+        if suffix == 0:
+            return None
+        start, end = max(size - suffix, 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        return None
+    return start, end
+
+# SQL QUERIES
+
+def project_tables(project_dir: str) -> Dict[str, List[str]]:
+    """Map the fact_/dim_ table names of a project to their files (several for a partitioned table)"""
+    tables = {}
+    for name in sorted(os.listdir(project_dir)):
+        stem, ext = os.path.splitext(name)
+        if stem.startswith(("fact_", "dim_")) and ext in OUTPUT_FORMATS.values():
+            tables[stem] = [os.path.join(project_dir, name)]
+    
+    # Partitioned tables only count the partitions registered by completed appends
+    project_id = os.path.basename(os.path.normpath(project_dir))[len("project_"):]
+    partitioned = {}
+    for part in load_partitions(project_id):
+        partitioned.setdefault(part["table_name"], []).append(os.path.join(project_dir, part["file"]))
+    tables.update(partitioned)
+    return tables
+
+def sql_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def sql_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+def iter_table_chunks(file_path: str):
+    """Yield a generated table as DataFrames of at most CSV_CHUNK_ROWS rows"""
+    if file_path.endswith('.csv'):
+        yield from pd.read_csv(file_path, chunksize=CSV_CHUNK_ROWS)
+    elif file_path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=CSV_CHUNK_ROWS):
+            yield batch.to_pandas()
+    else:
+        import pyarrow as pa
+        
+        reader = pa.ipc.open_file(pa.memory_map(file_path, 'r'))
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i).to_pandas()
+
+def open_duckdb(project_dir: str, tables: Dict[str, List[str]]):
+    """In-memory DuckDB with a view per table, reading the generated files in place"""
+    import duckdb
+    
+    conn = duckdb.connect()
+    try:
+        for name, paths in tables.items():
+            paths = [os.path.abspath(path) for path in paths]
+            if paths[0].endswith('.feather'):
+                import pyarrow as pa
+                import pyarrow.dataset as ds
+                
+                # A dataset is scanned lazily, so only the batches and columns a query needs are
+                # decompressed; partitions appended with new columns share one unified schema
+                schema = pa.unify_schemas([pa.ipc.open_file(path).schema for path in paths],
+                                          promote_options="permissive")
+                conn.register(name, ds.dataset(paths, schema=schema, format="ipc"))
+            else:
+                reader = "read_parquet" if paths[0].endswith('.parquet') else "read_csv_auto"
+                files = "[" + ", ".join(sql_literal(path) for path in paths) + "]"
+                conn.execute(f"CREATE VIEW {sql_identifier(name)} AS SELECT * FROM "
+                             f"{reader}({files}, union_by_name = true)")
+        
+        # Queries may read this project's files and nothing else (allowed_directories needs DuckDB 1.2)
+        conn.execute(f"SET allowed_directories = [{sql_literal(os.path.abspath(project_dir) + os.sep)}]")
+        conn.execute("SET enable_external_access = false")
+        conn.execute("SET lock_configuration = true")
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+def sqlite_query_db(project_dir: str, tables: Dict[str, List[str]]) -> str:
+    """Path of the project's SQLite copy of its tables, loaded on first use"""
+    db_path = os.path.join(project_dir, ".index", "query.sqlite")
+    if os.path.exists(db_path):
+        return db_path
+    
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    tmp_path = f"{db_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        conn = sqlite3.connect(tmp_path)
+        try:
+            with conn:
+                for name, paths in tables.items():
+                    created = False
+                    for chunk in (chunk for path in paths for chunk in iter_table_chunks(path)):
+                        chunk.to_sql(name, conn, if_exists='append', index=False)
+                        created = True
+                    if not created:
+                        pd.DataFrame(columns=table_columns(paths[0])).to_sql(name, conn, index=False)
+        finally:
+            conn.close()
+        os.replace(tmp_path, db_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return db_path
+
+def sqlite_read_only(action, arg1, arg2, db_name, trigger):
+    """SQLite authorizer that allows reading and nothing else"""
+    if action in (sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE):
+        return sqlite3.SQLITE_OK
+    return sqlite3.SQLITE_DENY
+
+def start_query(project_dir: str, sql: str):
+    """Open the query engine over a project and execute a read-only query.
+
+    Returns (connection, cursor, timer); the timer interrupts the query once
+    QUERY_TIMEOUT has passed, including while results are still streaming.
+    Raises ValueError for statements other than a single SELECT.
+    """
+    tables = project_tables(project_dir)
+    if QUERY_ENGINE == "duckdb":
+        conn = open_duckdb(project_dir, tables)
+    else:
+        db_path = sqlite_query_db(project_dir, tables)
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        conn.set_authorizer(sqlite_read_only)
+    
+    timer = threading.Timer(QUERY_TIMEOUT, conn.interrupt)
+    try:
+        if QUERY_ENGINE == "duckdb":
+            import duckdb
+            
+            statements = conn.extract_statements(sql)
+            if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+                raise ValueError("Only a single SELECT query is allowed")
+        timer.start()
+        cursor = conn.execute(sql)
+    except Exception:
+        timer.cancel()
+        conn.close()
+        raise
+    return conn, cursor, timer
+
+def stream_query_rows(conn, cursor, timer, output_format: str):
+    """Yield query results as NDJSON objects or CSV lines, QUERY_BATCH_ROWS at a time"""
+    columns = [d[0] for d in cursor.description]
+    try:
+        if output_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+        while True:
+            rows = cursor.fetchmany(QUERY_BATCH_ROWS)
+            if not rows:
+                break
+            if output_format == "csv":
+                writer.writerows(rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            else:
+                yield "".join(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows)
+    except Exception as e:
+        # Headers are already sent; NDJSON clients get the error as a last line
+        print(f"Query stream failed: {e}")
+        if output_format == "ndjson":
+            yield json.dumps({"error": str(e)}) + "\n"
+    finally:
+        timer.cancel()
+        conn.close()
 
-# Global cache for performance
-_files_cache = None
-_cache_timestamp = None
-CACHE_DURATION = 30  # Cache for 30 seconds
+# PARTITIONED APPENDS
 
-app = FastAPI(title="AutoDW", version="2.0.0")
+def load_partitions(project_id: str, table: Optional[str] = None, since: Optional[str] = None,
+                    until: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Registered partition files of a project, optionally of one table and within [since, until]"""
+    sql = "SELECT * FROM partitions WHERE project_id = ?"
+    params = [project_id]
+    if table is not None:
+        sql += " AND table_name = ?"
+        params.append(table)
+    if since is not None:
+        sql += " AND partition_value >= ?"
+        params.append(since)
+    if until is not None:
+        sql += " AND partition_value <= ?"
+        params.append(until)
+    
+    conn = metadata_db()
+    try:
+        rows = conn.execute(sql + " ORDER BY table_name, partition_value, file", params).fetchall()
+    finally:
+        conn.close()
+    return [dict(row) for row in rows]
 
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+def table_columns(file_path: str) -> List[str]:
+    """Column names of a generated table file"""
+    if file_path.endswith('.csv'):
+        return [str(c) for c in pd.read_csv(file_path, nrows=0).columns]
+    import pyarrow as pa
+    
+    if file_path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        
+        return pq.read_schema(file_path).names
+    return pa.ipc.open_file(pa.memory_map(file_path, 'r')).schema.names
 
-UPLOAD_DIR = "data/uploads"
-OUTPUT_DIR = "data/output"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+def partition_dir_name(value: str) -> str:
+    """Directory-safe form of a partition key or value"""
+    return re.sub(r"[^A-Za-z0-9._-]", "_", value)
 
-# Mount static files
-app.mount("/css", StaticFiles(directory="static/css"), name="css")
-app.mount("/js", StaticFiles(directory="static/js"), name="js")
+def partition_kind(values: pd.Series) -> str:
+    """"date" when a text column holds ISO dates (one partition per day), otherwise "value\""""
+    if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+        return "value"
+    sample = values.dropna().head(SCHEMA_PREFIX_ROWS)
+    if len(sample) and pd.to_datetime(sample.astype(str), errors='coerce', format='ISO8601').notna().all():
+        return "date"
+    return "value"
 
-# Setup templates
-templates = Jinja2Templates(directory="templates")
+def partition_values(values: pd.Series, kind: str) -> pd.Series:
+    """Partition value of each row: the day of a date, otherwise the value itself, directory-safe"""
+    present = values.notna().to_numpy()
+    if kind == "date":
+        days = pd.to_datetime(values.astype(object).where(present).astype(str), errors='coerce',
+                              format='ISO8601')
+        present = present & days.notna().to_numpy()
+        text = days.dt.strftime("%Y-%m-%d")
+    else:
+        text = values.astype(object).astype(str).str.replace(r"[^A-Za-z0-9._-]", "_", regex=True)
+    return pd.Series(np.where(present, text.to_numpy(dtype=object), PARTITION_NULL_VALUE), index=values.index)
 
-# MODELS
+class PartitionWriter:
+    """Writes the rows of a table into one part file per partition directory.
 
-class UploadResponse(BaseModel):
-    filename: str
-    rows: int
-    columns: List[str]
-    file_size: int
-    preview: List[Dict[str, Any]]
+    Files land at <table>/<key>=<value>/part-NNNNN<ext>. At most
+    PARTITION_MAX_OPEN_WRITERS files stay open; a partition whose writer was
+    closed to make room continues in a new part file.
+    """
 
-class BuildResponse(BaseModel):
-    project_id: str
-    status: str
-    fact_tables: List[str]
-    dimension_tables: List[str]
-    relationships: int
-    message: str
-    output_files: List[str]
+    def __init__(self, project_dir: str, table_name: str, key: str, columns: List[str],
+                 output_format: str, first_part: int):
+        self.project_dir = project_dir
+        self.table_dir = os.path.join(project_dir, table_name)
+        self.key_dir = partition_dir_name(key)
+        self.columns = columns
+        self.output_format = output_format
+        self.next_part = first_part
+        self.writers = OrderedDict()  # partition value -> (writer, part)
+        self.parts = []
 
-# API ENDPOINTS
+    def write(self, df: pd.DataFrame, values: pd.Series):
+        for value, rows in df.groupby(values.to_numpy(), sort=False):
+            if value in self.writers:
+                self.writers.move_to_end(value)
+            else:
+                if len({part["value"] for part in self.parts} | {value}) > PARTITION_MAX_VALUES:
+                    raise ValueError(f"More than {PARTITION_MAX_VALUES} partitions; "
+                                     f"choose a partition column with fewer distinct values")
+                if len(self.writers) >= PARTITION_MAX_OPEN_WRITERS:
+                    self.writers.popitem(last=False)[1][0].close()
+                part_dir = os.path.join(self.table_dir, f"{self.key_dir}={value}")
+                os.makedirs(part_dir, exist_ok=True)
+                file_name, writer = open_table_writer(part_dir, f"part-{self.next_part:05d}",
+                                                      self.columns, self.output_format)
+                self.next_part += 1
+                part = {"file": os.path.relpath(os.path.join(part_dir, file_name), self.project_dir),
+                        "value": value, "rows": 0}
+                self.parts.append(part)
+                self.writers[value] = (writer, part)
+            writer, part = self.writers[value]
+            writer.write(rows)
+            part["rows"] += len(rows)
 
-@app.get("/", response_class=HTMLResponse)
-async def root(request: Request):
-    """Main dashboard - opens in browser"""
-    return templates.TemplateResponse("index.html", {"request": request})
+    def close(self):
+        while self.writers:
+            self.writers.popitem(last=False)[1][0].close()
+        for part in self.parts:
+            part["bytes"] = os.path.getsize(os.path.join(self.project_dir, part["file"]))
 
-@app.get("/health")
-async def health():
-    return {"status": "healthy", "time": datetime.now().isoformat()}
+    def discard(self):
+        """Close and delete every part file written so far"""
+        while self.writers:
+            try:
+                self.writers.popitem(last=False)[1][0].close()
+            except Exception:
+                pass
+        for part in self.parts:
+            path = os.path.join(self.project_dir, part["file"])
+            for leftover in (path, row_index_path(path)):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
 
-@app.post("/upload", response_model=UploadResponse)
-async def upload_file(file: UploadFile = File(...)):
-    """Upload a CSV or PDF file"""
+def read_dimension(file_path: str) -> pd.DataFrame:
+    """A whole dimension table, with CSV attributes read as text like appended feeds are"""
+    if file_path.endswith('.csv'):
+        df = pd.read_csv(file_path, dtype=str)
+        key = df.columns[0]
+        return df.astype({key: 'int64'})
+    return pd.concat(list(iter_table_chunks(file_path)), ignore_index=True)
+
+def load_star_schema(fact_columns: List[str], dims: Dict[str, pd.DataFrame]) -> Optional[StreamingStarSchema]:
+    """Resume the StreamingStarSchema of a built fact table from its dimension tables.
     
-    if not file.filename.endswith(('.csv', '.pdf')):
-        raise HTTPException(400, "Only CSV and PDF files allowed")
+    Existing members keep their surrogate keys and new ones get the next keys,
+    so appended rows join the same dimensions as the original build.
+    """
+    dims = sorted((dim for dim in dims.values() if dim.columns[0] in fact_columns),
+                  key=lambda dim: fact_columns.index(dim.columns[0]))
+    if not dims:
+        return None
     
-    # Save file
-    file_path = os.path.join(UPLOAD_DIR, file.filename)
-    content = await file.read()
-    file_size = len(content)
+    splitter = StreamingStarSchema([list(dim.columns[1:]) for dim in dims], fact_columns)
+    splitter.key_names = [dim.columns[0] for dim in dims]
+    for members, dim in zip(splitter.members, dims):
+        for row in dim.sort_values(dim.columns[0]).itertuples(index=False):
+            members[tuple(None if pd.isna(v) else str(v) for v in row[1:])] = len(members) + 1
+        splitter.dtypes.update({col: "category" for col in dim.columns[1:]})
+    return splitter
+
+def profiler_path(project_dir: str, table_name: str) -> str:
+    """TableProfiler state of a partitioned table, resumed by the next append"""
+    return os.path.join(project_dir, ".index", "profilers", f"{table_name}.json")
+
+def load_table_profiler(project_dir: str, table_name: str, paths: List[str], skip: List[str]) -> TableProfiler:
+    try:
+        with open(profiler_path(project_dir, table_name), 'r') as f:
+            return TableProfiler.from_state(json.load(f))
+    except Exception:
+        # Missing, damaged or written by an older version: profile the existing partitions again
+        profiler = TableProfiler("fact", skip=skip)
+        for path in paths:
+            for chunk in iter_table_chunks(path):
+                profiler.update(chunk)
+        return profiler
+
+def append_partitions(project_id: str, file: str, partition_by: Optional[str] = None) -> Dict[str, Any]:
+    """Append an uploaded CSV to a project's fact table as new partitions (runs on the worker pool).
     
-    with open(file_path, "wb") as f:
-        f.write(content)
+    The first append turns the flat fact table into a partitioned one, split by
+    partition_by (a fact or dimension column) or, by default, by load date, the
+    rows built so far being dated by the day they were built. After that only
+    the new rows are written; dimensions gain any new members under the next
+    surrogate keys, and the profile and sketches are updated incrementally.
+    """
+    project_dir = os.path.join(OUTPUT_DIR, f"project_{project_id}")
+    file_path = os.path.join(UPLOAD_DIR, file)
+    tables = project_tables(project_dir)
+    facts = [name for name in tables if name.startswith("fact_")]
+    if len(facts) != 1:
+        raise ValueError("Appends need a project with exactly one fact table")
+    table = facts[0]
+    existing = load_partitions(project_id, table)
+    output_format = next(fmt for fmt, ext in OUTPUT_FORMATS.items() if tables[table][0].endswith(ext))
     
-    # Clear cache when new file is uploaded
-    global _files_cache, _cache_timestamp
-    _files_cache = None
-    _cache_timestamp = None
+    fact_columns = table_columns(tables[table][0])
+    dims = {name: read_dimension(paths[0]) for name, paths in tables.items() if name.startswith("dim_")}
+    splitter = load_star_schema(fact_columns, dims)
+    key_names = splitter.key_names if splitter else []
+    source_columns = [c for c in fact_columns if c not in key_names]
+    source_columns += [col for group in splitter.groups for col in group] if splitter else []
     
-    # Process based on file type
-    if file.filename.endswith('.csv'):
-        # Read CSV
-        df = pd.read_csv(file_path)
-        preview = df.head(5).to_dict(orient='records')
-    elif file.filename.endswith('.pdf'):
-        # Extract text from PDF
-        text_content = []
-        try:
-            with pdfplumber.open(io.BytesIO(content)) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_content.append(page_text)
-        except Exception as e:
-            raise HTTPException(400, f"Error processing PDF: {str(e)}")
+    if existing:
+        key, kind = existing[0]["partition_key"], existing[0]["partition_kind"]
+        if partition_by is not None and partition_by != key:
+            raise ValueError(f"{table} is already partitioned by {key}")
+    else:
+        key, kind = partition_by or PARTITION_LOAD_KEY, None
+        if key not in source_columns:
+            if key != PARTITION_LOAD_KEY:
+                raise ValueError(f"Unknown partition column: {key}")
+            # Partition by load date: the table gets a column holding it
+            fact_columns.append(key)
+            source_columns.append(key)
+            kind = "date"
+    
+    # The new rows must have the columns the table was built from; a feed without
+    # the load date column gets today's
+    schema = infer_schema(file_path)
+    add_load_date = key == PARTITION_LOAD_KEY and key not in schema["dtypes"]
+    file_columns = set(schema["dtypes"]) | ({key} if add_load_date else set())
+    if file_columns != set(source_columns):
+        missing = sorted(set(source_columns) - file_columns)
+        extra = sorted(file_columns - set(source_columns))
+        raise ValueError(f"{file} does not match {table}: missing columns {missing}, unexpected columns {extra}")
+    # Dimension attributes are matched as text against the existing members
+    dtypes = {**schema["dtypes"], **{col: "str" for col in source_columns if col not in fact_columns}}
+    chunk_rows = max(1000, int(BUILD_MEMORY_BUDGET / 8 / schema["row_bytes"]))
+    reader = pd.read_csv(file_path, dtype=dtypes, chunksize=chunk_rows)
+    first = next(iter(reader), None)
+    if first is None:
+        raise ValueError(f"{file} has no rows")
+    load_date = datetime.now().strftime("%Y-%m-%d")
+    if add_load_date:
+        first[key] = load_date
+    kind = kind or partition_kind(first[key])
+    
+    writer = PartitionWriter(project_dir, table, key, fact_columns, output_format,
+                             first_part=len(existing))
+    try:
+        if existing:
+            profiler = load_table_profiler(project_dir, table, tables[table], key_names)
+        else:
+            # Move the rows built so far into partitions first
+            flat_path = tables[table][0]
+            profiler = TableProfiler("fact", skip=key_names)
+            built_on = datetime.fromtimestamp(os.path.getmtime(flat_path)).strftime("%Y-%m-%d")
+            lookup = None
+            if key not in fact_columns:
+                # The key moved to a dimension: map surrogate keys back to its values
+                dim = next(dim for dim in dims.values() if key in dim.columns)
+                lookup = (dim.columns[0], pd.Series(dim[key].to_numpy(), index=dim[dim.columns[0]]))
+            with stage_timer("partition_convert") as sizes:
+                sizes["rows"] = 0
+                for chunk in iter_table_chunks(flat_path):
+                    if key in fact_columns and key not in chunk.columns:
+                        chunk[key] = built_on
+                    values = chunk[key] if lookup is None else chunk[lookup[0]].map(lookup[1])
+                    writer.write(chunk, partition_values(values, kind))
+                    profiler.update(chunk)
+                    sizes["rows"] += len(chunk)
+            # New rows go to part files of their own
+            writer.close()
+        if splitter:
+            # The loaded members describe every row built so far, so their limits count those rows too
+            splitter.rows = profiler.rows
         
-        # Convert extracted text to a structured format
-        full_text = "\n".join(text_content)
-        lines = [line.strip() for line in full_text.split("\n") if line.strip()]
-        
-        # Create a DataFrame with page and line information
-        data = []
-        for i, line in enumerate(lines[:20]):  # Limit to first 20 lines for preview
-            data.append({
-                "line_number": i + 1,
-                "content": line,
-                "word_count": len(line.split())
-            })
+        rows = 0
+        touched = set()
+        with stage_timer("partition_append") as sizes:
+            for chunk in itertools.chain([first], reader):
+                if add_load_date:
+                    chunk[key] = load_date
+                values = partition_values(chunk[key], kind)
+                touched.update(values.unique())
+                chunk = (splitter.split(chunk) if splitter else chunk)[fact_columns]
+                writer.write(chunk, values)
+                profiler.update(chunk)
+                rows += len(chunk)
+            sizes["rows"] = rows
+            sizes["bytes"] = os.path.getsize(file_path)
+        writer.close()
         
-        df = pd.DataFrame(data)
-        preview = df.head(5).to_dict(orient='records')
+        # Dimensions only grow, so rewriting them before registering the new partitions is safe
+        profiles = load_profile(project_id) or {}
+        sketches = load_sketches(project_id)
+        for dim_name, dim_df in (splitter.dimensions() if splitter else {}).items():
+            write_table(dim_df, project_dir, dim_name, output_format)
+            dim_profiler = profile_table(dim_df, "dimension", skip=[dim_df.columns[0]])
+            profiles[dim_name] = dim_profiler.profile()
+            sketches[dim_name] = dim_profiler.sketch()
+        profiles[table] = profiler.profile()
+        sketches[table] = profiler.sketch()
+        save_index_json(project_dir, "profile.json", profiles)
+        save_index_json(project_dir, "sketches.json", sketches)
+        os.makedirs(os.path.dirname(profiler_path(project_dir, table)), exist_ok=True)
+        with open(profiler_path(project_dir, table), 'w') as f:
+            json.dump(profiler.state(), f, default=str)
+    except BaseException:
+        writer.discard()
+        raise
     
-    return UploadResponse(
-        filename=file.filename,
-        rows=len(df),
-        columns=list(df.columns),
-        file_size=file_size,
-        preview=preview
-    )
+    created_at = datetime.now().isoformat()
+    conn = metadata_db()
+    try:
+        with conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO partitions (project_id, table_name, partition_key, partition_kind,
+                    partition_value, file, rows, bytes, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(project_id, table, key, kind, part["value"], part["file"], part["rows"], part["bytes"],
+                   created_at) for part in writer.parts])
+    finally:
+        conn.close()
+    
+    # The partitions now hold every row: drop the flat table and the stale SQLite query copy
+    if not existing:
+        for leftover in (flat_path, row_index_path(flat_path)):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    query_db = os.path.join(project_dir, ".index", "query.sqlite")
+    if os.path.exists(query_db):
+        os.remove(query_db)
+    
+    st = os.stat(file_path)
+    return {
+        "file": file,
+        "table": table,
+        "partition_key": key,
+        "partition_kind": kind,
+        "partitions": sorted(touched),
+        "rows": rows,
+        "signature": {"size": st.st_size, "mtime": st.st_mtime,
+                      "hash": upload_hashes([file]).get(file) or file_hash(file_path)},
+        "summary": summarize_project(project_id)
+    }
+
+def read_partitioned_preview(project_id: str, table: str, offset: int = 0, limit: int = 10,
+                             columns: Optional[List[str]] = None, since: Optional[str] = None,
+                             until: Optional[str] = None) -> Dict[str, Any]:
+    """Preview payload for a row range of a partitioned table.
 
-@app.post("/build", response_model=BuildResponse)
-async def build_warehouse():
-    """Build warehouse from uploaded files - creates one project per uploaded file"""
+    Only partitions within [since, until] count, and of those only the files
+    overlapping the range are read, located through their recorded row counts.
+    """
+    project_dir = os.path.join(OUTPUT_DIR, f"project_{project_id}")
+    parts = load_partitions(project_id, table, since, until)
+    any_part = parts[0] if parts else next(iter(load_partitions(project_id, table)), None)
+    if any_part is None:
+        raise ValueError(f"{table} has no partitions")
+    first_path = os.path.join(project_dir, any_part["file"])
+    all_columns = table_columns(first_path)
+    columns = check_columns(all_columns, columns)
     
-    # Get all CSV and PDF files
-    files = [f for f in os.listdir(UPLOAD_DIR) if f.endswith(('.csv', '.pdf'))]
+    frames = []
+    wanted = limit
+    part_start = 0
+    for part in parts:
+        if wanted <= 0:
+            break
+        if part_start + part["rows"] > offset:
+            path = os.path.join(project_dir, part["file"])
+            skip = max(offset - part_start, 0)
+            read_range = read_csv_range if path.endswith('.csv') else read_columnar_range
+            _, _, df = read_range(path, skip, wanted, columns)
+            frames.append(df)
+            wanted -= len(df)
+        part_start += part["rows"]
     
-    print(f"DEBUG: Found {len(files)} files in uploads: {files}")
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns or all_columns)
+    return {
+        "file_name": table,
+        "file_type": first_path.rsplit('.', 1)[1],
+        "columns": columns or all_columns,
+        "total_rows": sum(part["rows"] for part in parts),
+        "partitions": len({part["partition_value"] for part in parts}),
+        "offset": offset,
+        "limit": limit,
+        "preview_data": df.to_dict(orient='records')
+    }
+
+def record_appends(project_id: str, results: List[Dict[str, Any]]) -> List[str]:
+    """Record appended uploads in the build manifest so /build skips them (runs on the worker pool).
     
-    if not files:
-        raise HTTPException(400, "No files uploaded. Upload files first.")
+    The project's entries are marked partitioned, which keeps the project when
+    its source upload changes or is removed. Returns every project id in the
+    manifest. Projects built before the manifest existed have no entry to copy,
+    so their appended uploads are not recorded.
+    """
+    manifest = load_manifest()
+    table = results[0]["table"]
+    entries = [entry for entry in manifest.values() if entry["project_id"] == project_id]
+    for entry in entries:
+        entry["partitioned"] = True
+        entry["output_files"] = [table if os.path.splitext(name)[0] == table else name
+                                 for name in entry["output_files"]]
+    if entries:
+        base = {k: v for k, v in entries[0].items() if k not in ("size", "mtime", "hash")}
+        for result in results:
+            manifest[result["file"]] = {**base, **result["signature"], "appended": True}
+    save_manifest(manifest)
+    return list(dict.fromkeys(entry["project_id"] for entry in manifest.values()))
+
+# BUILD JOBS
+
+def lock_file(path: str):
+    """Block until this process holds an exclusive lock on path; closing the returned file releases it"""
+    f = open(path, 'a')
+    if fcntl is not None:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        except BaseException:
+            f.close()
+            raise
+    return f
+
+@contextlib.asynccontextmanager
+async def build_lock():
+    """Exclusive use of data/output, shared by this process's jobs and every other server worker"""
+    global _build_lock
+    if _build_lock is None:
+        _build_lock = asyncio.Lock()
     
-    # Clear any existing projects to prevent duplicates
-    if os.path.exists(OUTPUT_DIR):
-        shutil.rmtree(OUTPUT_DIR)
-        os.makedirs(OUTPUT_DIR)
+    async with _build_lock:
+        lock = await run_in_threadpool(lock_file, BUILD_LOCK_PATH)
+        try:
+            yield
+        finally:
+            lock.close()
+
+def save_job_row(job_id: str, status: str, revision: int, data: str, finished: bool):
+    """Store a job snapshot unless a newer one got there first, pruning old finished jobs"""
+    conn = metadata_db()
+    try:
+        with conn:
+            conn.execute("""
+                INSERT INTO jobs (job_id, status, revision, updated_at, data) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (job_id) DO UPDATE SET status = excluded.status, revision = excluded.revision,
+                    updated_at = excluded.updated_at, data = excluded.data
+                WHERE excluded.revision > jobs.revision
+            """, (job_id, status, revision, datetime.now().isoformat(), data))
+            if finished:
+                conn.execute("""
+                    DELETE FROM jobs WHERE status NOT IN ('queued', 'running') AND job_id NOT IN (
+                        SELECT job_id FROM jobs WHERE status NOT IN ('queued', 'running')
+                        ORDER BY updated_at DESC LIMIT ?
+                    )
+                """, (MAX_FINISHED_JOBS,))
+    finally:
+        conn.close()
+
+def load_job_row(job_id: str) -> Optional[Dict[str, Any]]:
+    conn = metadata_db()
+    try:
+        row = conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row["data"]) if row else None
+    finally:
+        conn.close()
+
+async def publish_job(job: Dict[str, Any]):
+    """Share a job's progress so /jobs answers from any server worker"""
+    data = json.dumps(job, default=str)
+    try:
+        await run_in_threadpool(save_job_row, job["job_id"], job["status"], next(_job_revisions), data,
+                                job["finished_at"] is not None)
+    except Exception as e:
+        print(f"Could not publish job {job['job_id']}: {e}")
+
+def create_job(files: List[str], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Register a queued build job for the given upload files"""
+    job_id = uuid.uuid4().hex[:12]
+    job = {
+        "job_id": job_id,
+        "status": "queued",
+        "options": options,
+        "created_at": datetime.now().isoformat(),
+        "started_at": None,
+        "finished_at": None,
+        "duration_seconds": None,
+        "total_files": len(files),
+        "completed_files": 0,
+        "skipped_files": 0,
+        "failed_files": 0,
+        "files": {
+            f: {"status": "pending", "project_id": None, "duration_seconds": None, "error": None}
+            for f in files
+        },
+        "result": None,
+        "error": None
+    }
+    _jobs[job_id] = job
     
-    all_fact_tables = []
-    all_dim_tables = []
-    all_output_files = []
-    project_ids = []
+    # Forget the oldest finished jobs
+    finished = [j for j in _jobs.values() if j["finished_at"] is not None]
+    for old in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+        _jobs.pop(old["job_id"], None)
     
-    # Process each file separately to create individual projects
-    for file in files:
-        print(f"DEBUG: Processing file: {file}")
-        # Generate unique project ID with timestamp and file name
-        file_base = file.replace('.csv', '').replace('.pdf', '')
-        project_id = datetime.now().strftime("%Y%m%d_%H%M%S") + f"_{file_base[:10]}"
-        project_dir = os.path.join(OUTPUT_DIR, f"project_{project_id}")
-        os.makedirs(project_dir, exist_ok=True)
-        
-        file_path = os.path.join(UPLOAD_DIR, file)
+    return job
+
+async def build_job_file(job: Dict[str, Any], file: str, digest: str) -> Dict[str, Any]:
+    """Build one file of a job on the worker pool, recording progress and errors"""
+    entry = job["files"][file]
+    entry["status"] = "running"
+    start = time.perf_counter()
+    try:
+        if file.endswith('.pdf'):
+            # Fan pages out across the pool first; the build then reads them from the cache
+            await extract_pdf(os.path.join(UPLOAD_DIR, file), digest)
+        result = await run_in_pool(build_project, file, job["options"], digest, reject_when_full=False)
+        entry["status"] = "completed"
+        entry["project_id"] = result["project_id"]
+        job["completed_files"] += 1
+        return result
+    except Exception as e:
+        print(f"Build error for {file}: {e}")
+        entry["status"] = "failed"
+        entry["error"] = str(e)
+        job["failed_files"] += 1
+        return None
+    finally:
+        entry["duration_seconds"] = round(time.perf_counter() - start, 3)
+        record_stage("build_file", time.perf_counter() - start, failed=entry["status"] == "failed")
+        await publish_job(job)
+
+async def run_build_job(job: Dict[str, Any]):
+    """Process every file of a build job concurrently, independent of the HTTP request"""
+    async with build_lock():
+        job["status"] = "running"
+        job["started_at"] = datetime.now().isoformat()
+        start = time.perf_counter()
+        files = list(job["files"])
+        await publish_job(job)
         
-        # Process the file
-        if file.endswith('.csv'):
-            df = pd.read_csv(file_path)
-        elif file.endswith('.pdf'):
-            # Process PDF and convert to CSV format
-            with open(file_path, 'rb') as f:
-                pdf_content = f.read()
+        try:
+            # Only rebuild uploads whose content changed since the last build
+            plan = await run_in_pool(plan_build, files, job["options"], reject_when_full=False)
+            manifest = dict(plan["unchanged"])
+            duplicates = plan["duplicates"]
+            for file, entry in plan["unchanged"].items():
+                status = "duplicate" if file in duplicates else "unchanged"
+                job["files"][file].update(status=status, project_id=entry["project_id"])
+                job["skipped_files"] += 1
             
-            text_content = []
-            with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_content.append(page_text)
+            # Drop projects of changed or removed uploads before rebuilding them
+            await run_in_pool(remove_projects, plan["stale_projects"], reject_when_full=False)
             
-            full_text = "\n".join(text_content)
-            lines = [line.strip() for line in full_text.split("\n") if line.strip()]
+            # Uploads with the same content as another changed one are built once
+            changed = [file for file in plan["changed"] if file not in duplicates]
+            results = await asyncio.gather(*[
+                build_job_file(job, file, plan["changed"][file]["hash"]) for file in changed
+            ])
+            summaries = []
+            for file, result in zip(changed, results):
+                if result is not None:
+                    summaries.append(result.pop("summary"))
+                    manifest[file] = {**plan["changed"][file], **result}
+            for file, source in duplicates.items():
+                if file in plan["changed"]:
+                    entry = job["files"][file]
+                    if source in manifest:
+                        manifest[file] = {**manifest[source], **plan["changed"][file]}
+                        entry.update(status="duplicate", project_id=manifest[file]["project_id"])
+                        job["skipped_files"] += 1
+                    else:
+                        entry.update(status="failed", error=f"Build of identical upload {source} failed")
+                        job["failed_files"] += 1
             
-            data = []
-            for i, line in enumerate(lines):
-                data.append({
-                    "line_number": i + 1,
-                    "content": line,
-                    "word_count": len(line.split())
-                })
+            await run_in_pool(save_manifest, manifest, reject_when_full=False)
+            await run_in_pool(update_project_index, summaries, plan["stale_projects"], reject_when_full=False)
             
-            df = pd.DataFrame(data)
-        
-        table_name = file_base.lower()
-        
-        # Simple detection: if has numeric columns and many rows -> fact
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-        
-        fact_tables = []
-        dim_tables = []
-        output_files = []
+            # Link fact columns to dimension keys across all projects
+            projects = {entry["project_id"]: entry for entry in manifest.values()}
+            cross_links = await run_in_pool(
+                refresh_relationships, list(projects), reject_when_full=False
+            )
+            
+            all_fact_tables = []
+            all_dim_tables = []
+            all_output_files = []
+            project_ids = []
+            relationships = cross_links
+            for result in projects.values():
+                relationships += result.get("relationships", 0)
+                all_fact_tables.extend(result["fact_tables"])
+                all_dim_tables.extend(result["dimension_tables"])
+                all_output_files.extend(result["output_files"])
+                project_ids.append(result["project_id"])
+            
+            message = f"Created {job['completed_files']} separate projects from {len(files)} files"
+            if job["skipped_files"]:
+                message += f", {job['skipped_files']} unchanged or duplicate"
+            if cross_links:
+                message += f"; found {cross_links} cross-file relationships"
+            if job["failed_files"]:
+                message += f" ({job['failed_files']} failed)"
+            
+            job["result"] = jsonable_encoder(BuildResponse(
+                project_id=project_ids[0] if project_ids else datetime.now().strftime("%Y%m%d_%H%M%S"),
+                status="success" if project_ids else "failed",
+                fact_tables=all_fact_tables,
+                dimension_tables=all_dim_tables,
+                relationships=relationships,
+                message=message,
+                output_files=all_output_files
+            ))
+            job["status"] = "completed" if project_ids else "failed"
+        except Exception as e:
+            print(f"Build job {job['job_id']} failed: {e}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["finished_at"] = datetime.now().isoformat()
+            job["duration_seconds"] = round(time.perf_counter() - start, 3)
+            await publish_job(job)
+
+async def run_append_job(job: Dict[str, Any], project_id: str, partition_by: Optional[str]):
+    """Append the files of a job to a project's partitioned fact table, one after another"""
+    async with build_lock():
+        job["status"] = "running"
+        job["started_at"] = datetime.now().isoformat()
+        start = time.perf_counter()
+        await publish_job(job)
         
-        if len(numeric_cols) > len(df.columns) / 2 and len(df) > 10:
-            # This is a fact table
-            fact_name = f"fact_{table_name}"
-            fact_tables.append(fact_name)
-            all_fact_tables.append(fact_name)
+        try:
+            results = []
+            for file, entry in job["files"].items():
+                entry["status"] = "running"
+                file_start = time.perf_counter()
+                try:
+                    result = await run_in_pool(append_partitions, project_id, file, partition_by,
+                                               reject_when_full=False)
+                    # Later files go to the partitions the first one chose
+                    partition_by = result["partition_key"]
+                    entry.update(status="completed", project_id=project_id)
+                    job["completed_files"] += 1
+                    results.append(result)
+                except Exception as e:
+                    print(f"Append error for {file}: {e}")
+                    entry.update(status="failed", error=str(e))
+                    job["failed_files"] += 1
+                finally:
+                    entry["duration_seconds"] = round(time.perf_counter() - file_start, 3)
+                    record_stage("append_file", time.perf_counter() - file_start,
+                                 failed=entry["status"] == "failed")
+                    await publish_job(job)
             
-            # Save as CSV
-            output_path = os.path.join(project_dir, f"{fact_name}.csv")
-            df.to_csv(output_path, index=False)
-            output_files.append(f"{fact_name}.csv")
-        else:
-            # This is a dimension table
-            dim_name = f"dim_{table_name}"
-            dim_tables.append(dim_name)
-            all_dim_tables.append(dim_name)
+            if results:
+                project_ids = await run_in_pool(record_appends, project_id, results, reject_when_full=False)
+                await run_in_pool(update_project_index, [results[-1]["summary"]], reject_when_full=False)
+                await run_in_pool(refresh_relationships, project_ids, reject_when_full=False)
             
-            # Save as CSV
-            output_path = os.path.join(project_dir, f"{dim_name}.csv")
-            df.to_csv(output_path, index=False)
-            output_files.append(f"{dim_name}.csv")
+            rows = sum(result["rows"] for result in results)
+            partitions = sorted({value for result in results for value in result["partitions"]})
+            message = f"Appended {rows} rows from {len(results)} files to {len(partitions)} partitions"
+            if job["failed_files"]:
+                message += f" ({job['failed_files']} failed)"
+            job["result"] = {
+                "project_id": project_id,
+                "table": results[0]["table"] if results else None,
+                "partition_key": partition_by,
+                "rows_appended": rows,
+                "partitions": partitions,
+                "message": message
+            }
+            job["status"] = "completed" if results else "failed"
+        except Exception as e:
+            print(f"Append job {job['job_id']} failed: {e}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["finished_at"] = datetime.now().isoformat()
+            job["duration_seconds"] = round(time.perf_counter() - start, 3)
+            await publish_job(job)
+
+def start_job(coro):
+    """Run a job coroutine in the background, keeping a reference until it finishes"""
+    task = asyncio.create_task(coro)
+    _job_tasks.add(task)
+    task.add_done_callback(_job_tasks.discard)
+    return task
+
+# UPLOAD INGESTION
+
+async def ingest_upload(filename: str, read, reject_when_full: bool = True) -> UploadResponse:
+    """Stream one CSV or PDF upload into the store and return its stats; read(n) returns the next chunk"""
+    # Stream file to disk, never holding more than one chunk in memory
+    file_path = os.path.join(UPLOAD_DIR, filename)
+    tmp_path = os.path.join(UPLOAD_OBJECTS_DIR, f"{uuid.uuid4().hex}.part")
+    is_csv = filename.endswith('.csv')
+    stats = CsvStreamStats() if is_csv else None
+    hasher = new_file_hasher()
+    file_size = 0
+    
+    try:
+        with stage_timer("upload_write") as sizes, open(tmp_path, "wb") as f:
+            while True:
+                chunk = await read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                await run_in_threadpool(write_chunk, f, chunk, hasher, stats)
+                file_size += len(chunk)
+            sizes["bytes"] = file_size
+        # Content already in the store is linked under the new name instead of kept twice
+        digest = hasher.hexdigest()
+        stored = await run_in_threadpool(store_upload, tmp_path, filename, digest, file_size)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    
+    file_mtime = os.stat(file_path).st_mtime
+    
+    # Process based on file type
+    if stored is not None:
+        # Duplicate content - reuse the stats and preview from when it was first parsed
+        rows, columns, preview = stored["rows"], stored["columns"], stored["preview"]
+        if is_csv:
+            await remember_file_stats(filename, file_size, file_mtime, rows, len(columns))
+        else:
+            cache_file_stats(filename, file_size, file_mtime, *pdf_stats(file_size))
+    elif is_csv:
+        try:
+            rows, columns, preview = await run_in_pool(CsvStreamStats.result, stats, reject_when_full=reject_when_full)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(400, f"Error processing CSV: {str(e)}")
         
-        # Create project name based on file
-        clean_name = file_base.replace('_', ' ').replace('-', ' ')
-        clean_name = ' '.join(word.capitalize() for word in clean_name.split())
+        # The streaming parse already produced exact stats for /files
+        await remember_file_stats(filename, file_size, file_mtime, rows, len(columns))
+    else:
+        # Extract text from PDF - only as many pages as the preview needs
+        try:
+            data = await run_in_pool(pdf_preview, file_path, digest, reject_when_full=reject_when_full)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(400, f"Error processing PDF: {str(e)}")
         
-        # Create metadata for this individual file project
-        metadata = f"""Project Name: {clean_name}
-Project ID: {project_id}
-Date: {datetime.now()}
-Files: 1
-Source File: {file}
-Fact Tables: {', '.join(fact_tables)}
-Dimension Tables: {', '.join(dim_tables)}
-Relationships: {len(fact_tables)}
-"""
+        df = pd.DataFrame(data, columns=["line_number", "content", "word_count"])
+        rows = len(df)
+        columns = list(df.columns)
+        preview = df.head(PREVIEW_ROWS).to_dict(orient='records')
+        cache_file_stats(filename, file_size, file_mtime, *pdf_stats(file_size))
         
-        with open(os.path.join(project_dir, "README.txt"), "w") as f:
-            f.write(metadata)
-        
-        output_files.append("README.txt")
-        all_output_files.extend(output_files)
-        project_ids.append(project_id)
-    
-    return BuildResponse(
-        project_id=project_ids[0] if project_ids else datetime.now().strftime("%Y%m%d_%H%M%S"),
-        status="success",
-        fact_tables=all_fact_tables,
-        dimension_tables=all_dim_tables,
-        relationships=len(all_fact_tables),
-        message=f"Created {len(project_ids)} separate projects from {len(files)} files",
-        output_files=all_output_files
+        # Extract the remaining pages across the pool now, so the build reuses them
+        start_job(warm_pdf_cache(file_path, digest))
+    
+    if stored is None:
+        try:
+            await run_in_threadpool(save_upload_result, digest, {"rows": rows, "columns": columns, "preview": preview})
+        except Exception as e:
+            print(f"Could not store upload stats for {filename}: {e}")
+    
+    return UploadResponse(
+        filename=filename,
+        rows=rows,
+        columns=columns,
+        file_size=file_size,
+        preview=preview
     )
 
-@app.get("/files")
-async def list_files():
-    """List uploaded files - optimized with caching"""
-    global _files_cache, _cache_timestamp
+def is_archive_upload(info: zipfile.ZipInfo) -> bool:
+    """Zip entries that are CSV/PDF files, skipping folders and OS metadata like __MACOSX/"""
+    name = os.path.basename(info.filename)
+    return (not info.is_dir() and name.endswith(('.csv', '.pdf')) and not name.startswith('.')
+            and not info.filename.startswith('__MACOSX/'))
+
+async def batch_failure(filename: str, status_code: int, error: str) -> Dict[str, Any]:
+    return {"filename": filename, "status": "failed", "status_code": status_code, "error": error}
+
+async def ingest_batch_item(filename: str, read=None, archive: zipfile.ZipFile = None,
+                            info: zipfile.ZipInfo = None) -> Dict[str, Any]:
+    """Ingest one file of a batch upload, turning errors into a failed result line"""
+    if not filename.endswith(('.csv', '.pdf')):
+        return await batch_failure(filename, 400, "Only CSV, PDF and ZIP files allowed")
+    
+    entry = None
+    try:
+        if archive is not None:
+            # Zip members can be read concurrently; the archive serializes access to the file
+            entry = await run_in_threadpool(archive.open, info)
+            read = functools.partial(run_in_threadpool, entry.read)
+        result = await ingest_upload(filename, read, reject_when_full=False)
+        return {"status": "uploaded", **jsonable_encoder(result)}
+    except HTTPException as e:
+        return await batch_failure(filename, e.status_code, str(e.detail))
+    except Exception as e:
+        print(f"Batch upload error for {filename}: {e}")
+        return await batch_failure(filename, 500, str(e))
+    finally:
+        if entry is not None:
+            entry.close()
+
+async def stream_batch_results(items: List[Any], archives: List[zipfile.ZipFile]):
+    """Run batch upload items with bounded concurrency, yielding NDJSON results as they finish"""
+    semaphore = asyncio.Semaphore(BATCH_UPLOAD_CONCURRENCY)
+    
+    async def bounded(item):
+        async with semaphore:
+            return await item()
+    
+    tasks = [asyncio.create_task(bounded(item)) for item in items]
+    counts = {"uploaded": 0, "failed": 0}
+    start = time.perf_counter()
+    try:
+        for finished in asyncio.as_completed(tasks):
+            result = await finished
+            counts[result["status"]] += 1
+            yield json.dumps(result, default=str) + "\n"
+        yield json.dumps({
+            "done": True,
+            "total_files": len(items),
+            **counts,
+            "duration_seconds": round(time.perf_counter() - start, 3)
+        }) + "\n"
+    finally:
+        # The client went away or everything finished; stop whatever is still queued
+        for task in tasks:
+            task.cancel()
+        for archive in archives:
+            archive.close()
+
+# API ENDPOINTS
+
+@app.get("/", response_class=HTMLResponse)
+async def root(request: Request):
+    """Main dashboard - opens in browser"""
+    return templates.TemplateResponse("index.html", {"request": request})
+
+@app.get("/health")
+async def health():
+    return {"status": "healthy", "time": datetime.now().isoformat(), "startup": _startup}
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: per-stage latency and throughput histograms, worker pool queue depth"""
+    if not METRICS_ENABLED:
+        raise HTTPException(404, "Metrics need prometheus-client to be installed")
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.post("/upload", response_model=UploadResponse)
+async def upload_file(file: UploadFile = File(...)):
+    """Upload a CSV or PDF file - streamed to disk in chunks"""
+    
+    if not file.filename.endswith(('.csv', '.pdf')):
+        raise HTTPException(400, "Only CSV and PDF files allowed")
+    
+    return await ingest_upload(file.filename, file.read)
+
+@app.post("/upload/batch")
+async def upload_batch(files: List[UploadFile] = File(...)):
+    """Upload many CSV/PDF files, or .zip archives of them, in one request.
+    Up to AUTODW_BATCH_CONCURRENCY files are ingested at once; one NDJSON line
+    per file streams back as it finishes, followed by a summary line."""
+    items = []
+    archives = []
+    saved_as = {}  # Upload name -> the batch entry saved under it
+    
+    def add_item(name: str, source: str, **kwargs):
+        # Zip members are saved under their base name, so jan/sales.csv and feb/sales.csv
+        # would overwrite each other; only the first one is ingested
+        if name in saved_as:
+            items.append(functools.partial(
+                batch_failure, source, 409,
+                f"{source} would be saved as {name}, which {saved_as[name]} already uses in this batch"
+            ))
+            return
+        saved_as[name] = source
+        items.append(functools.partial(ingest_batch_item, name, **kwargs))
+    
+    for file in files:
+        if file.filename.endswith('.zip'):
+            try:
+                archive = await run_in_threadpool(zipfile.ZipFile, file.file)
+            except (zipfile.BadZipFile, OSError) as e:
+                items.append(functools.partial(batch_failure, file.filename, 400, f"Invalid zip archive: {e}"))
+                continue
+            archives.append(archive)
+            for info in archive.infolist():
+                if is_archive_upload(info):
+                    add_item(os.path.basename(info.filename), f"{file.filename}/{info.filename}",
+                             archive=archive, info=info)
+        else:
+            add_item(file.filename, file.filename, read=file.read)
+    
+    if not items:
+        raise HTTPException(400, "No CSV or PDF files found in the upload")
+    
+    return StreamingResponse(stream_batch_results(items, archives), media_type="application/x-ndjson")
+
+@app.post("/build", response_model=JobResponse, status_code=202)
+async def build_warehouse(format: Optional[str] = None, normalize: Optional[bool] = None):
+    """Queue a warehouse build - creates one project per uploaded file in the background.
+    Only new or modified uploads are rebuilt. Poll /jobs/{job_id} for progress.
+    Pass ?format=parquet or ?format=feather for columnar output tables, and
+    ?normalize=false to keep fact tables wide instead of splitting out dimensions."""
+    
+    output_format = format or OUTPUT_FORMAT
+    if output_format not in OUTPUT_FORMATS:
+        raise HTTPException(400, f"Unknown output format: {output_format}. Use one of: {', '.join(OUTPUT_FORMATS)}")
+    if output_format != "csv" and importlib.util.find_spec("pyarrow") is None:
+        raise HTTPException(400, f"{output_format} output requires pyarrow to be installed")
+    
+    # Get all CSV and PDF files
+    files = [f for f in os.listdir(UPLOAD_DIR) if f.endswith(('.csv', '.pdf'))]
     
-    current_time = datetime.now()
+    if not files:
+        raise HTTPException(400, "No files uploaded. Upload files first.")
     
-    # Check if cache is valid
-    if (_files_cache is not None and 
-        _cache_timestamp is not None and 
-        (current_time - _cache_timestamp).seconds < CACHE_DURATION):
-        return {"uploaded_files": _files_cache}
+    options = {
+        "format": output_format,
+        "normalize": NORMALIZE_TABLES if normalize is None else normalize
+    }
+    job = create_job(files, options)
+    await publish_job(job)
+    start_job(run_build_job(job))
     
-    # Cache expired or not set, rebuild it
+    return JobResponse(
+        job_id=job["job_id"],
+        status=job["status"],
+        total_files=len(files),
+        message=f"Build queued for {len(files)} files"
+    )
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Report progress, per-file timings and errors for a build job"""
+    job = _jobs.get(job_id)
+    if job is None:
+        # The job may belong to another server worker
+        job = await run_in_threadpool(load_job_row, job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+    return job
+
+@app.get("/files")
+async def list_files():
+    """List uploaded files - stats are cached per file and only recomputed when it changes"""
     files = []
-    if os.path.exists(UPLOAD_DIR):
-        for f in os.listdir(UPLOAD_DIR):
-            if f.endswith(('.csv', '.pdf')):
-                file_path = os.path.join(UPLOAD_DIR, f)
-                try:
-                    # Quick file info without full processing for list view
-                    file_size = os.path.getsize(file_path)
-                    file_mtime = os.path.getmtime(file_path)
-                    
-                    # Simplified row count calculation
-                    if f.endswith('.csv'):
-                        try:
-                            # Quick CSV row count without loading full data
-                            with open(file_path, 'r') as file:
-                                row_count = sum(1 for _ in file) - 1  # Subtract header
-                            col_count = len(pd.read_csv(file_path, nrows=1).columns.tolist())
-                        except:
-                            row_count, col_count = 0, 0
-                    else:
-                        # For PDFs, estimate based on file size
-                        row_count = min(file_size // 1000, 1000)  # Rough estimate
-                        col_count = 3  # Standard PDF processing columns
-                    
-                    files.append({
-                        "name": f,
-                        "size": file_size,
-                        "rows": row_count,
-                        "columns": col_count,
-                        "modified": datetime.fromtimestamp(file_mtime).isoformat()
-                    })
-                except:
-                    continue
+    misses = []
+    infos = await run_in_threadpool(stat_upload_files)
+    
+    # Uploads handled by another server worker may already have exact stats in the shared index
+    unknown = [info["name"] for info in infos if info["name"].endswith('.csv')
+               and get_cached_file_stats(info["name"], info["size"], info["mtime"]) is None]
+    if unknown:
+        try:
+            for entry in await run_in_threadpool(load_shared_file_stats, unknown):
+                cache_file_stats(**entry)
+        except Exception as e:
+            print(f"Could not load shared upload stats: {e}")
     
-    # Update cache
-    _files_cache = files
-    _cache_timestamp = current_time
+    for info in infos:
+        name, size, mtime = info["name"], info["size"], info["mtime"]
+        estimated = False
+        entry = get_cached_file_stats(name, size, mtime)
+        
+        if entry is not None:
+            row_count, col_count = entry["rows"], entry["columns"]
+        elif name.endswith('.pdf'):
+            row_count, col_count = pdf_stats(size)
+            cache_file_stats(name, size, mtime, row_count, col_count)
+        else:
+            # Answer from a quick estimate now, count exactly in the background
+            try:
+                row_count, col_count = await run_in_threadpool(estimate_csv_stats, name, size)
+            except Exception:
+                row_count, col_count = 0, 0
+            estimated = True
+            if name not in _files_pending:
+                misses.append(name)
+        
+        files.append({
+            "name": name,
+            "size": size,
+            "rows": row_count,
+            "columns": col_count,
+            "rows_estimated": estimated,
+            "modified": datetime.fromtimestamp(mtime).isoformat()
+        })
+    
+    if misses:
+        _files_pending.update(misses)
+        start_job(fill_file_stats(misses))
     
     return {"uploaded_files": files}
 
+@app.delete("/files/{file_name}")
+async def delete_file(file_name: str):
+    """Delete an uploaded file; its stored content goes once no other upload name shares it"""
+    if not file_name.endswith(('.csv', '.pdf')) or os.path.basename(file_name) != file_name:
+        raise HTTPException(400, "Only CSV and PDF uploads can be deleted")
+    if not await run_in_threadpool(remove_upload, file_name):
+        raise HTTPException(404, "File not found")
+    _files_cache.pop(file_name, None)
+    return {"message": "File deleted", "filename": file_name}
+
 @app.get("/projects", response_class=HTMLResponse)
 async def projects_page(request: Request):
     """Projects page - list all built projects"""
     return templates.TemplateResponse("projects.html", {"request": request})
 
 @app.get("/api/projects")
-async def list_projects():
-    """API endpoint to list all built projects with real data"""
-    projects = []
-    seen_projects = set()  # Track unique project names
+async def list_projects(search: Optional[str] = None, sort: str = "built_at", order: str = "desc",
+                        limit: int = 1000, offset: int = 0):
+    """API endpoint to list built projects from the metadata index.
+    Supports ?search=, ?sort=, ?order=asc|desc, ?limit= and ?offset=; the total
+    number of matching projects is returned in the X-Total-Count header."""
+    if sort not in PROJECT_SORT_FIELDS:
+        raise HTTPException(400, f"Cannot sort by {sort}. Use one of: {', '.join(sorted(PROJECT_SORT_FIELDS))}")
+    if order.lower() not in ("asc", "desc"):
+        raise HTTPException(400, "order must be asc or desc")
+    limit = max(1, min(limit, 1000))
+    offset = max(0, offset)
     
     try:
-        if os.path.exists(OUTPUT_DIR):
-            items = os.listdir(OUTPUT_DIR)
-            
-            for item in items:
-                if item.startswith("project_") and len(item) > 8:
-                    project_id = item[8:]  # Remove prefix
-                    project_path = os.path.join(OUTPUT_DIR, item)
-                    
-                    # Skip duplicates by checking project_id
-                    if project_id in seen_projects:
-                        continue
-                    seen_projects.add(project_id)
-                    
-                    # Get real project data
-                    try:
-                        files = os.listdir(project_path)
-                        
-                        # Count fact and dimension tables
-                        fact_tables = []
-                        dim_tables = []
-                        total_size = 0
-                        
-                        for file in files:
-                            file_path = os.path.join(project_path, file)
-                            if os.path.isfile(file_path):
-                                total_size += os.path.getsize(file_path) / (1024 * 1024)  # MB
-                                
-                                if file.startswith("fact_"):
-                                    fact_tables.append(file)
-                                elif file.startswith("dim_"):
-                                    dim_tables.append(file)
-                        
-                        # Extract project name from README if available, with deduplication handling
-                        base_name = project_id[:15]  # Use first part of ID
-                        project_name = base_name.replace('_', ' ').title()
-                        
-                        # Add timestamp to make names unique
-                        if '_' in project_id:
-                            timestamp_part = project_id.split('_')[0] if len(project_id.split('_')) > 1 else ''
-                            if timestamp_part and len(timestamp_part) >= 12:  # YYYYMMDDHHMMSS format
-                                try:
-                                    date_obj = datetime.strptime(timestamp_part, "%Y%m%d%H%M%S")
-                                    formatted_date = date_obj.strftime("%m/%d %H:%M")
-                                    project_name = f"{base_name} ({formatted_date})"
-                                except:
-                                    pass
-                        
-                        created_at = "2024-01-01"  # Default
-                        
-                        readme_path = os.path.join(project_path, "README.txt")
-                        if os.path.exists(readme_path):
-                            try:
-                                with open(readme_path, 'r') as f:
-                                    content = f.read()
-                                    for line in content.split('\n'):
-                                        if line.startswith('Project Name:'):
-                                            project_name = line.replace('Project Name:', '').strip()
-                                        elif line.startswith('Date:'):
-                                            created_at = line.replace('Date:', '').strip()
-                                            # Extract just the date part
-                                            if ' ' in created_at:
-                                                created_at = created_at.split(' ')[0]
-                            except:
-                                pass
-                        
-                        projects.append({
-                            "project_id": project_id,
-                            "project_name": project_name,
-                            "created_at": created_at,
-                            "fact_tables": fact_tables,
-                            "dimension_tables": dim_tables,
-                            "fact_tables_count": len(fact_tables),
-                            "dim_tables_count": len(dim_tables),
-                            "total_size_mb": round(total_size, 2),
-                            "file_count": len(files)
-                        })
-                        
-                    except Exception as e:
-                        print(f"Error processing project {project_id}: {e}")
-                        # Skip this project and continue
-                        continue
-        
-        # Only add sample data if absolutely no projects exist
-        if len(projects) == 0:
-            projects = [
-                {
-                    "project_id": "sample_20240101_120000",
-                    "project_name": "Sample Sales Data",
-                    "created_at": "2024-01-01",
-                    "fact_tables": ["fact_sales"],
-                    "dimension_tables": ["dim_customer", "dim_product", "dim_time"],
-                    "fact_tables_count": 1,
-                    "dim_tables_count": 3,
-                    "total_size_mb": 1.5,
-                    "file_count": 5
-                }
-            ]
-    
+        # Indexed SQLite lookups are cheap, so they skip the (possibly busy) parsing pool
+        with stage_timer("project_listing") as sizes:
+            projects, total = await run_in_threadpool(query_projects, search, sort, order.upper(), limit, offset)
+            sizes["rows"] = len(projects)
     except Exception as e:
         print(f"API error: {e}")
-        projects = []
+        projects, total = [], 0
+    
+    # Only add sample data if absolutely no projects exist
+    if total == 0 and not search:
+        projects = [
+            {
+                "project_id": "sample_20240101_120000",
+                "project_name": "Sample Sales Data",
+                "created_at": "2024-01-01",
+                "fact_tables": ["fact_sales"],
+                "dimension_tables": ["dim_customer", "dim_product", "dim_time"],
+                "fact_tables_count": 1,
+                "dim_tables_count": 3,
+                "total_size_mb": 1.5,
+                "file_count": 5
+            }
+        ]
+    
+    return JSONResponse(content=projects, headers={"X-Total-Count": str(total)})
+
+@app.get("/api/relationships")
+async def list_relationships(project_id: Optional[str] = None):
+    """Foreign-key links discovered between projects, optionally for one project"""
+    return await run_in_threadpool(query_relationships, project_id)
+
+@app.get("/api/projects/{project_id}/profile")
+async def get_project_profile(project_id: str, table: Optional[str] = None):
+    """Column statistics of a project's tables, as computed when they were written"""
+    profile = await run_in_threadpool(load_profile, project_id)
+    if profile is None:
+        raise HTTPException(404, "No profile for this project (rebuild it to compute one)")
+    if table is not None:
+        if table not in profile:
+            raise HTTPException(404, f"Unknown table: {table}")
+        return profile[table]
+    return profile
+
+@app.post("/api/projects/{project_id}/query")
+async def query_project(project_id: str, query: QueryRequest):
+    """Run a read-only SQL query over a project's fact_/dim_ tables and stream the rows back"""
+    if query.format not in QUERY_FORMATS:
+        raise HTTPException(400, f"Unknown format: {query.format}. Use one of: {', '.join(QUERY_FORMATS)}")
+    
+    project_dir = os.path.join(OUTPUT_DIR, f"project_{project_id}")
+    if not os.path.isdir(project_dir):
+        raise HTTPException(404, "Project not found")
+    
+    try:
+        conn, cursor, timer = await run_in_threadpool(start_query, project_dir, query.sql)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(400, f"Query failed: {str(e)}")
+    
+    return StreamingResponse(stream_query_rows(conn, cursor, timer, query.format),
+                             media_type=QUERY_FORMATS[query.format])
+
+@app.post("/api/projects/{project_id}/append", response_model=JobResponse, status_code=202)
+async def append_to_project(project_id: str, request: AppendRequest):
+    """Append uploaded CSVs to a project's fact table as new partitions, in the background.
+    Rows are partitioned by the partition_by column (fixed by the first append) or by load date."""
+    project_dir = os.path.join(OUTPUT_DIR, f"project_{project_id}")
+    if not os.path.isdir(project_dir):
+        raise HTTPException(404, "Project not found")
+    if not request.files:
+        raise HTTPException(400, "No files to append")
+    for file in request.files:
+        if not file.endswith('.csv') or os.path.basename(file) != file:
+            raise HTTPException(400, f"Only uploaded CSV files can be appended: {file}")
+        if not os.path.isfile(os.path.join(UPLOAD_DIR, file)):
+            raise HTTPException(404, f"Upload not found: {file}")
+    
+    files = list(dict.fromkeys(request.files))
+    job = create_job(files, {"append_to": project_id, "partition_by": request.partition_by})
+    await publish_job(job)
+    start_job(run_append_job(job, project_id, request.partition_by))
     
-    return JSONResponse(content=projects)
+    return JobResponse(
+        job_id=job["job_id"],
+        status=job["status"],
+        total_files=len(files),
+        message=f"Append queued for {len(files)} files"
+    )
+
+@app.get("/api/projects/{project_id}/partitions")
+async def list_partitions(project_id: str, table: Optional[str] = None, since: Optional[str] = None,
+                          until: Optional[str] = None):
+    """Partition files of a project's appended tables with row and byte counts,
+    optionally only ?table= and partition values within ?since= / ?until="""
+    if not os.path.isdir(os.path.join(OUTPUT_DIR, f"project_{project_id}")):
+        raise HTTPException(404, "Project not found")
+    partitions = await run_in_threadpool(load_partitions, project_id, table, since, until)
+    return {
+        "project_id": project_id,
+        "partitions": partitions,
+        "total_rows": sum(part["rows"] for part in partitions),
+        "total_bytes": sum(part["bytes"] for part in partitions)
+    }
 
 @app.get("/preview/{project_id}/{file_name}")
-async def preview_file(project_id: str, file_name: str):
-    """Preview a file's content"""
+async def preview_file(project_id: str, file_name: str, offset: int = 0, limit: int = 10,
+                       columns: Optional[str] = None, since: Optional[str] = None,
+                       until: Optional[str] = None):
+    """Preview a file's content - a page of rows from ?offset= with ?limit= rows,
+    optionally restricted to ?columns=a,b,c. Partitioned tables can be limited to
+    partitions from ?since= to ?until="""
     project_path = os.path.join(OUTPUT_DIR, f"project_{project_id}")
     file_path = os.path.join(project_path, file_name)
     
     if not os.path.exists(file_path):
         raise HTTPException(404, "File not found")
     
+    offset = max(0, offset)
+    limit = max(1, min(limit, PREVIEW_MAX_LIMIT))
+    column_list = [c.strip() for c in columns.split(',') if c.strip()] if columns else None
+    
     try:
-        if file_name.endswith('.csv'):
-            df = pd.read_csv(file_path)
-            preview_data = df.head(10).to_dict(orient='records')
-            columns = list(df.columns)
-            total_rows = len(df)
-            
-            return JSONResponse({
-                "file_name": file_name,
-                "file_type": "csv",
-                "columns": columns,
-                "total_rows": total_rows,
-                "preview_data": preview_data
-            })
-        else:
-            # For text files
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            return JSONResponse({
-                "file_name": file_name,
-                "file_type": "text",
-                "content": content[:2000]  # First 2000 characters
-            })
+        if os.path.isdir(file_path):
+            return JSONResponse(await run_in_pool(read_partitioned_preview, project_id, file_name, offset,
+                                                  limit, column_list, since, until))
+        return JSONResponse(await run_in_pool(read_preview, file_path, file_name, offset, limit, column_list))
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         raise HTTPException(500, f"Error reading file: {str(e)}")
 
+@app.get("/download/{project_id}.zip")
+async def download_project_zip(project_id: str, request: Request, table: Optional[str] = None,
+                               since: Optional[str] = None, until: Optional[str] = None):
+    """Download a whole project as a zip, streamed while it is compressed.
+    ?table= limits it to one table and ?since= / ?until= to those partitions.
+    Supports Range / If-Range so interrupted downloads can resume."""
+    project_path = os.path.join(OUTPUT_DIR, f"project_{project_id}")
+    if not os.path.isdir(project_path):
+        raise HTTPException(404, "Project not found")
+    
+    files = await run_in_threadpool(archive_files, project_path, table, since, until)
+    if table is not None and not files:
+        raise HTTPException(404, f"No files for table {table}")
+    etag = archive_etag(files)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": f'"{etag}"',
+        "Content-Disposition": f'attachment; filename="project_{project_id}.zip"'
+    }
+    
+    # A resume against a different archive gets the whole new one
+    byte_range = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip('"') != etag:
+        byte_range = None
+    
+    if not byte_range:
+        layout = await run_in_threadpool(load_archive_layout, project_path, etag)
+        if layout is None:
+            # First download: compress while streaming, recording the layout for resumes
+            return StreamingResponse(iter_project_zip(project_path, files, etag),
+                                     media_type="application/zip", headers=headers)
+        headers["Content-Length"] = str(layout["size"])
+        return StreamingResponse(iter_zip_range(project_path, layout, 0, layout["size"] - 1),
+                                 media_type="application/zip", headers=headers)
+    
+    try:
+        layout = await run_in_pool(archive_layout, project_path, files, etag)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(500, f"Error preparing archive: {str(e)}")
+    
+    try:
+        span = parse_range(byte_range, layout["size"])
+    except ValueError:
+        span = (0, layout["size"] - 1)
+        status_code = 200
+    else:
+        if span is None:
+            raise HTTPException(416, "Requested range not satisfiable",
+                                headers={"Content-Range": f"bytes */{layout['size']}"})
+        status_code = 206
+        headers["Content-Range"] = f"bytes {span[0]}-{span[1]}/{layout['size']}"
+    
+    headers["Content-Length"] = str(span[1] - span[0] + 1)
+    return StreamingResponse(iter_zip_range(project_path, layout, *span), status_code=status_code,
+                             media_type="application/zip", headers=headers)
+
 @app.get("/download/{project_id}/{file_name}")
-async def download_file(project_id: str, file_name: str):
-    """Download a specific file from a project"""
+async def download_file(project_id: str, file_name: str, since: Optional[str] = None,
+                        until: Optional[str] = None):
+    """Download a specific file from a project; a partitioned table comes as a zip of
+    its partitions, optionally ?since= / ?until="""
     project_path = os.path.join(OUTPUT_DIR, f"project_{project_id}")
     file_path = os.path.join(project_path, file_name)
     
     if not os.path.exists(file_path):
         raise HTTPException(404, "File not found")
     
+    if os.path.isdir(file_path):
+        from fastapi.responses import RedirectResponse
+        from urllib.parse import urlencode
+        
+        params = {"table": file_name, "since": since, "until": until}
+        query = urlencode({k: v for k, v in params.items() if v is not None})
+        return RedirectResponse(f"/download/{project_id}.zip?{query}")
+    
     from fastapi.responses import FileResponse
     return FileResponse(file_path, media_type='application/octet-stream', filename=file_name)
 
@@ -493,24 +3902,23 @@ async def delete_project(project_id: str):
         
         print(f"Deleting project: {project_path}")
         
-        # Check if it's a directory or file
-        if os.path.isdir(project_path):
-            # Remove the entire project directory permanently
-            shutil.rmtree(project_path)
-            print(f"Directory deleted: {project_path}")
-        else:
-            # Remove the file (e.g., zip file) permanently
-            os.remove(project_path)
-            print(f"File deleted: {project_path}")
-        
-        # Verify deletion
-        if os.path.exists(project_path):
-            raise Exception(f"Failed to delete: {project_path} still exists")
-        
-        # Clear ALL caches to prevent reappearing
-        global _files_cache, _cache_timestamp
-        _files_cache = None
-        _cache_timestamp = None
+        # Wait for any running build, in this or another server worker, to finish with data/output
+        async with build_lock():
+            # Check if it's a directory or file
+            if os.path.isdir(project_path):
+                # Remove the entire project directory permanently
+                shutil.rmtree(project_path)
+                print(f"Directory deleted: {project_path}")
+            elif os.path.exists(project_path):
+                # Remove the file (e.g., zip file) permanently
+                os.remove(project_path)
+                print(f"File deleted: {project_path}")
+            
+            # Verify deletion
+            if os.path.exists(project_path):
+                raise Exception(f"Failed to delete: {project_path} still exists")
+            
+            await run_in_threadpool(update_project_index, [], [project_id])
         
         print(f"Project {project_id} permanently deleted")
         
@@ -529,7 +3937,7 @@ async def download_project(project_id: str, request: Request):
     if not os.path.exists(project_path):
         raise HTTPException(404, "Project not found")
     
-    files = os.listdir(project_path)
+    files = [f for f in os.listdir(project_path) if not f.startswith('.')]
     file_sizes = {f: os.path.getsize(os.path.join(project_path, f)) / 1024 for f in files}
     
     return templates.TemplateResponse("project.html", {
@@ -541,6 +3949,8 @@ async def download_project(project_id: str, request: Request):
         "file_sizes": file_sizes
     })
 
+_startup["import_seconds"] = round(time.perf_counter() - _import_started, 3)
+
 # Auto-open browser
 
 def open_browser():
@@ -576,4 +3986,6 @@ if __name__ == "__main__":
     print("=" * 50)
     
     # Run server
+    import uvicorn
+    
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,24 @@
+"""
+Gunicorn settings for running AutoDW across several worker processes
+Run: gunicorn -c gunicorn.conf.py app:app
+"""
+
+import os
+
+cpu_count = os.cpu_count() or 2
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("AUTODW_SERVER_WORKERS", cpu_count))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Each server worker starts its own parsing pool; split the cores between them
+# instead of starting cpu_count pool processes per worker
+os.environ.setdefault("AUTODW_WORKERS", str(max(1, cpu_count // workers)))
+
+# Import the app in each worker, after the fork, so pools and locks are never shared
+preload_app = False
+
+# Builds run in the background, so requests themselves stay short
+timeout = 120
+graceful_timeout = 60
+keepalive = 5
@@ -0,0 +1,358 @@
+"""
+AutoDW benchmark - drives the app in-process against synthetic uploads
+Run: python scripts/benchmark.py --rows 200000 --pdf-pages 50
+Save a baseline with --save-baseline, compare later runs with --baseline
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import subprocess
+import platform
+import tempfile
+import resource
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import List, Dict, Any
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(REPO_DIR, "benchmarks", "baseline.json")
+GENERATE_CHUNK_ROWS = 100_000  # Synthetic CSVs are written in chunks, so any row count fits in memory
+JOB_POLL_SECONDS = 0.05
+STARTUP_RUNS = 5  # Fresh interpreters timed importing the app
+
+# Metrics compared against the baseline: name -> True when higher is better
+COMPARED_METRICS = {
+    "startup.import_p50_seconds": False,
+    "upload_csv.p50_ms": False,
+    "upload_csv.p99_ms": False,
+    "upload_csv.mb_per_second": True,
+    "upload_pdf.p50_ms": False,
+    "build.seconds": False,
+    "build.rows_per_second": True,
+    "rebuild.seconds": False,
+    "list_files.p50_ms": False,
+    "list_files.p99_ms": False,
+    "list_projects.p50_ms": False,
+    "list_projects.p99_ms": False,
+    "preview.p50_ms": False,
+    "preview.p99_ms": False,
+    "peak_rss_mb": False,
+}
+
+WORDS = ["revenue", "order", "customer", "region", "invoice", "shipment", "quarter", "total",
+         "product", "warehouse", "balance", "account", "discount", "supplier", "payment", "report"]
+
+# SYNTHETIC DATA
+
+def parse_dtype_mix(spec: str) -> List[str]:
+    """Turn "int=2,float=2,category=3" into a list of column kinds"""
+    kinds = []
+    for part in spec.split(","):
+        kind, _, count = part.strip().partition("=")
+        if kind not in ("int", "float", "category", "string", "date", "bool"):
+            raise ValueError(f"Unknown column kind: {kind}")
+        kinds.extend([kind] * int(count or 1))
+    return kinds
+
+def column_kinds(columns: int, dtype_mix: str) -> List[str]:
+    """Repeat the dtype mix until there are as many kinds as columns"""
+    mix = parse_dtype_mix(dtype_mix)
+    return [mix[i % len(mix)] for i in range(columns)]
+
+def synthetic_chunk(kinds: List[str], start: int, rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    """Generate one chunk of rows - categories repeat so the build can split out dimensions"""
+    data = {}
+    for i, kind in enumerate(kinds):
+        name = f"{kind}_{i}"
+        if kind == "int":
+            data[name] = np.arange(start, start + rows) if i == 0 else rng.integers(0, 1_000_000, rows)
+        elif kind == "float":
+            data[name] = np.round(rng.normal(1000, 250, rows), 2)
+        elif kind == "category":
+            labels = np.array([f"{WORDS[(i + j) % len(WORDS)]}_{j}" for j in range(20 + 10 * i)])
+            data[name] = labels[rng.integers(0, len(labels), rows)]
+        elif kind == "string":
+            data[name] = np.char.add("id_", rng.integers(0, 10 ** 9, rows).astype(str))
+        elif kind == "date":
+            days = rng.integers(0, 3650, rows).astype("timedelta64[D]")
+            data[name] = (np.datetime64("2015-01-01") + days).astype(str)
+        else:
+            data[name] = rng.random(rows) < 0.5
+    return pd.DataFrame(data)
+
+def generate_csv(path: str, rows: int, columns: int, dtype_mix: str, seed: int) -> int:
+    """Write a synthetic CSV chunk by chunk and return its size in bytes"""
+    kinds = column_kinds(columns, dtype_mix)
+    rng = np.random.default_rng(seed)
+    with open(path, "w", newline="") as f:
+        for start in range(0, rows, GENERATE_CHUNK_ROWS):
+            chunk = synthetic_chunk(kinds, start, min(GENERATE_CHUNK_ROWS, rows - start), rng)
+            chunk.to_csv(f, index=False, header=start == 0)
+    return os.path.getsize(path)
+
+def pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def generate_pdf(path: str, pages: int, lines_per_page: int, seed: int) -> int:
+    """Write a plain-text PDF by hand (no extra dependencies) and return its size in bytes"""
+    rand = random.Random(seed)
+    # Objects 1-3 are the catalog, page tree and font; each page adds a page and a content object
+    page_ids = [4 + 2 * p for p in range(pages)]
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {pages} >>".encode(),
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    for page_id in page_ids:
+        lines = [" ".join(rand.choice(WORDS) for _ in range(rand.randint(4, 12))) for _ in range(lines_per_page)]
+        text = "\n".join(f"({pdf_escape(line)}) Tj T*" for line in lines)
+        stream = f"BT /F1 10 Tf 12 TL 50 780 Td\n{text}\nET".encode()
+        objects[page_id] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>").encode()
+        objects[page_id + 1] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+    
+    body = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = len(body)
+        body += b"%d 0 obj\n%s\nendobj\n" % (obj_id, objects[obj_id])
+    xref_offset = len(body)
+    body += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for obj_id in sorted(objects):
+        body += b"%010d 00000 n \n" % offsets[obj_id]
+    body += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    
+    with open(path, "wb") as f:
+        f.write(body)
+    return len(body)
+
+# MEASUREMENT
+
+def latency_summary(seconds: List[float]) -> Dict[str, Any]:
+    """p50/p99/mean latency in milliseconds plus request throughput"""
+    ms = np.array(seconds) * 1000
+    return {
+        "count": len(seconds),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "requests_per_second": round(len(seconds) / max(sum(seconds), 1e-9), 2)
+    }
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def check(response, expected=(200,)):
+    if response.status_code not in expected:
+        raise RuntimeError(f"{response.request.method} {response.request.url} -> "
+                           f"{response.status_code}: {response.text[:500]}")
+    return response
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process and the largest pool worker"""
+    usage = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    return round(usage / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def run_build(client, format: str) -> Dict[str, Any]:
+    """Queue a build and poll it to completion"""
+    job_id = check(client.post(f"/build?format={format}"), (202,)).json()["job_id"]
+    while True:
+        job = check(client.get(f"/jobs/{job_id}")).json()
+        if job["status"] in ("completed", "failed"):
+            break
+        time.sleep(JOB_POLL_SECONDS)
+    if job["status"] == "failed" or job["failed_files"]:
+        errors = {f: e["error"] for f, e in job["files"].items() if e["error"]}
+        raise RuntimeError(f"Build failed: {job['error'] or errors}")
+    return job
+
+def measure_startup() -> Dict[str, Any]:
+    """Time importing the app in fresh interpreters, as a new server worker does (lazy imports stay lazy)"""
+    code = "import json, app; print(json.dumps(app._startup))"
+    imports = []
+    for _ in range(STARTUP_RUNS):
+        output = subprocess.run([sys.executable, "-c", code], cwd=os.getcwd(), check=True,
+                                capture_output=True, text=True, env={**os.environ, "PYTHONPATH": REPO_DIR})
+        imports.append(json.loads(output.stdout.strip().splitlines()[-1])["import_seconds"])
+    return {
+        "import_p50_seconds": round(float(np.percentile(imports, 50)), 3),
+        "import_max_seconds": round(max(imports), 3)
+    }
+
+def run_benchmark(args, work_dir: str) -> Dict[str, Any]:
+    """Generate inputs, then time every endpoint against them"""
+    inputs_dir = os.path.join(work_dir, "inputs")
+    os.makedirs(inputs_dir)
+    
+    print(f"Generating {args.csv_files} CSV(s) of {args.rows:,} rows x {args.columns} columns "
+          f"and {args.pdf_files} PDF(s) of {args.pdf_pages} pages...")
+    inputs = []
+    for i in range(args.csv_files):
+        path = os.path.join(inputs_dir, f"bench_{i}.csv")
+        inputs.append((path, generate_csv(path, args.rows, args.columns, args.dtypes, args.seed + i), args.rows))
+    for i in range(args.pdf_files):
+        path = os.path.join(inputs_dir, f"bench_{i}.pdf")
+        inputs.append((path, generate_pdf(path, args.pdf_pages, args.pdf_lines, args.seed + i), None))
+    
+    # The app resolves data/, static/ and templates/ relative to the working directory
+    for name in ("static", "templates"):
+        os.symlink(os.path.join(REPO_DIR, name), os.path.join(work_dir, name))
+    os.chdir(work_dir)
+    results = {"startup": measure_startup()}
+    sys.path.insert(0, REPO_DIR)
+    from fastapi.testclient import TestClient
+    import app as autodw
+    
+    with TestClient(autodw.app) as client:
+        # Uploads
+        csv_times, pdf_times = [], []
+        csv_bytes = 0
+        for path, size, _ in inputs:
+            with open(path, "rb") as f:
+                _, seconds = timed(lambda: check(client.post("/upload", files={"file": (os.path.basename(path), f)})))
+            if path.endswith(".csv"):
+                csv_times.append(seconds)
+                csv_bytes += size
+            else:
+                pdf_times.append(seconds)
+        if csv_times:
+            results["upload_csv"] = latency_summary(csv_times)
+            results["upload_csv"]["mb_per_second"] = round(csv_bytes / 1024 / 1024 / sum(csv_times), 2)
+        if pdf_times:
+            results["upload_pdf"] = latency_summary(pdf_times)
+        
+        # Full build, then an incremental build with nothing changed
+        job, seconds = timed(run_build, client, args.format)
+        total_rows = sum(rows for _, _, rows in inputs if rows)
+        results["build"] = {
+            "seconds": round(seconds, 3),
+            "files": job["total_files"],
+            "rows_per_second": round(total_rows / seconds, 1) if total_rows else None
+        }
+        job, seconds = timed(run_build, client, args.format)
+        results["rebuild"] = {"seconds": round(seconds, 3), "skipped_files": job["skipped_files"]}
+        
+        # Listings
+        results["list_files"] = latency_summary(
+            [timed(lambda: check(client.get("/files")))[1] for _ in range(args.requests)])
+        results["list_projects"] = latency_summary(
+            [timed(lambda: check(client.get("/api/projects")))[1] for _ in range(args.requests)])
+        
+        # Previews at random offsets across every generated table
+        tables = []
+        for project in client.get("/api/projects").json():
+            project_dir = os.path.join(autodw.OUTPUT_DIR, f"project_{project['project_id']}")
+            tables.extend((project["project_id"], name) for name in os.listdir(project_dir)
+                          if name.endswith(tuple(autodw.OUTPUT_FORMATS.values())))
+        rand = random.Random(args.seed)
+        preview_times = []
+        for i in range(args.requests if tables else 0):
+            project_id, name = tables[i % len(tables)]
+            offset = rand.randint(0, max(args.rows - 10, 0)) if i % 2 else 0
+            preview_times.append(timed(lambda: check(client.get(f"/preview/{project_id}/{name}?offset={offset}")))[1])
+        if preview_times:
+            results["preview"] = latency_summary(preview_times)
+    
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+# BASELINE COMPARISON
+
+def metric_value(results: Dict[str, Any], name: str):
+    value = results
+    for key in name.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print each metric next to the baseline and return the ones that regressed past the threshold"""
+    if baseline.get("config") != results.get("config"):
+        print("WARNING: baseline was recorded with a different configuration; comparison may be meaningless")
+    
+    regressions = []
+    print(f"\n{'metric':<28}{'baseline':>14}{'current':>14}{'change':>10}")
+    for name, higher_is_better in COMPARED_METRICS.items():
+        old, new = metric_value(baseline["results"], name), metric_value(results["results"], name)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        regressed = (-change if higher_is_better else change) > threshold
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<28}{old:>14,.2f}{new:>14,.2f}{change:>+10.1%}{flag}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+# MAIN
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AutoDW upload, build, listing and preview endpoints")
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows per synthetic CSV")
+    parser.add_argument("--columns", type=int, default=12, help="Columns per synthetic CSV")
+    parser.add_argument("--dtypes", default="int=2,float=3,category=4,string=1,date=1,bool=1",
+                        help="Column kind mix: int, float, category, string, date, bool")
+    parser.add_argument("--csv-files", type=int, default=2)
+    parser.add_argument("--pdf-files", type=int, default=1)
+    parser.add_argument("--pdf-pages", type=int, default=20)
+    parser.add_argument("--pdf-lines", type=int, default=40, help="Text lines per PDF page")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per listing/preview measurement")
+    parser.add_argument("--format", default="csv", help="Output table format for /build")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the results JSON here")
+    parser.add_argument("--baseline", nargs="?", const=DEFAULT_BASELINE, help="Compare against a stored baseline")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, help="Store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative slowdown before failing")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary working directory")
+    args = parser.parse_args()
+    
+    config = {k: v for k, v in vars(args).items()
+              if k not in ("output", "baseline", "save_baseline", "threshold", "keep")}
+    config["pool"] = os.environ.get("AUTODW_POOL", "process")
+    config["workers"] = os.environ.get("AUTODW_WORKERS", str(os.cpu_count()))
+    
+    work_dir = tempfile.mkdtemp(prefix="autodw_bench_")
+    try:
+        results = {
+            "recorded_at": datetime.now().isoformat(),
+            "machine": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+            "config": config,
+            "results": run_benchmark(args, work_dir)
+        }
+    finally:
+        os.chdir(REPO_DIR)
+        if args.keep:
+            print(f"Working directory kept at {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    
+    print(json.dumps(results["results"], indent=2))
+    for path in (args.output, args.save_baseline):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"Results written to {path}")
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline")
+
+if __name__ == "__main__":
+    main()
@@ -38,12 +38,12 @@ class AutoDWApp {
                 uploadArea.style.borderColor = '';
                 uploadArea.style.background = '';
                 const files = Array.from(e.dataTransfer.files).filter(f => 
-                    f.name.endsWith('.csv') || f.name.endsWith('.pdf')
+                    f.name.endsWith('.csv') || f.name.endsWith('.pdf') || f.name.endsWith('.zip')
                 );
                 if (files.length > 0) {
                     this.uploadFiles(files);
                 } else {
-                    this.showToast('Please drop CSV or PDF files only', 'error');
+                    this.showToast('Please drop CSV, PDF or ZIP files only', 'error');
                 }
             });
         }
@@ -207,28 +207,51 @@ class AutoDWApp {
         }
 
         try {
+            // One request for every file; results stream back as NDJSON lines as each file finishes
+            const formData = new FormData();
             for (let file of files) {
-                console.log('Processing file:', file.name);
-                
-                const formData = new FormData();
-                formData.append('file', file);
+                formData.append('files', file);
+            }
 
-                this.showToast(`Uploading ${file.name}...`, 'info');
+            this.showToast(`Uploading ${files.length} file${files.length === 1 ? '' : 's'}...`, 'info');
 
-                const response = await fetch('/upload', {
-                    method: 'POST',
-                    body: formData
-                });
+            const response = await fetch('/upload/batch', {
+                method: 'POST',
+                body: formData
+            });
 
-                if (!response.ok) {
-                    const errorData = await response.json();
-                    throw new Error(errorData.detail || `Upload failed: ${response.status}`);
+            if (!response.ok) {
+                const errorData = await response.json();
+                throw new Error(errorData.detail || `Upload failed: ${response.status}`);
+            }
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let summary = null;
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                const lines = buffer.split('\n');
+                buffer = lines.pop();
+                for (const line of lines.filter(l => l.trim())) {
+                    const result = JSON.parse(line);
+                    if (result.done) {
+                        summary = result;
+                    } else if (result.status === 'uploaded') {
+                        console.log('Upload successful:', result);
+                        this.showToast(`${result.filename} uploaded successfully!`, 'success');
+                    } else {
+                        console.error('Upload failed:', result);
+                        this.showToast(`${result.filename}: ${result.error}`, 'error');
+                    }
                 }
+            }
 
-                const result = await response.json();
-                console.log('Upload successful:', result);
-                
-                this.showToast(`${file.name} uploaded successfully!`, 'success');
+            if (summary && summary.failed) {
+                this.showToast(`${summary.uploaded} of ${summary.total_files} files uploaded`, 'error');
             }
             
             // Reload files list
@@ -264,7 +287,10 @@ class AutoDWApp {
                     throw new Error('Build failed');
                 }
 
-                const result = await response.json();
+                const job = await response.json();
+                console.log('Build job queued:', job);
+
+                const result = await this.waitForJob(job.job_id, buildBtn);
                 console.log('Build result:', result);
                 
                 this.showToast(`✨ Warehouse built successfully!`, 'success');
@@ -294,6 +320,28 @@ class AutoDWApp {
         }
     }
 
+    // Poll a background build job until it finishes, showing progress on the button
+    async waitForJob(jobId, buildBtn) {
+        while (true) {
+            const response = await fetch(`${this.apiBase}/jobs/${jobId}`);
+            if (!response.ok) {
+                throw new Error(`Lost track of build job: ${response.status}`);
+            }
+
+            const job = await response.json();
+            if (job.status === 'completed') {
+                return job.result;
+            }
+            if (job.status === 'failed') {
+                throw new Error(job.error || (job.result && job.result.message) || 'Build failed');
+            }
+
+            const done = job.completed_files + job.skipped_files + job.failed_files;
+            buildBtn.innerHTML = `<i class="fas fa-spinner fa-spin"></i> Building... ${done}/${job.total_files}`;
+            await new Promise(resolve => setTimeout(resolve, 1000));
+        }
+    }
+
     // Add blinking effect to Warehouse button when new files are processed
     addWarehouseBlinking() {
         console.log('🔔 Attempting to add warehouse blinking effect...');
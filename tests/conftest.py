@@ -0,0 +1,26 @@
+"""Shared fixtures: every test runs the app against its own empty data directory"""
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Work runs in threads of this process, so it sees each test's working directory
+os.environ.setdefault("AUTODW_POOL", "thread")
+os.environ.setdefault("AUTODW_STARTUP", "lazy")
+
+
+@pytest.fixture
+def autodw(tmp_path, monkeypatch):
+    """The app module, working in a temporary directory laid out like the repository root"""
+    for name in ("static", "templates"):
+        os.symlink(os.path.join(ROOT, name), tmp_path / name)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(ROOT)
+    import app
+    
+    for directory in (app.UPLOAD_DIR, app.UPLOAD_OBJECTS_DIR, app.OUTPUT_DIR):
+        os.makedirs(directory, exist_ok=True)
+    monkeypatch.setattr(app, "_metadata_ready", False)
+    app._files_cache.clear()
+    return app
@@ -0,0 +1,34 @@
+"""Appending CSV feeds to a built project as new partitions"""
+import os
+
+import pandas as pd
+
+
+def sales(order_ids, products):
+    return pd.DataFrame({
+        "order_id": order_ids,
+        "product": [f"p{p}" for p in products],
+        "category": [f"c{p % 7}" for p in products],
+        "amount": [i * 1.5 for i in order_ids],
+        "qty": [i % 9 + 1 for i in order_ids],
+    })
+
+
+def test_append_to_normalized_project_adds_new_members(autodw):
+    # 300 products over 2000 rows are within the dimension limits; the append brings 100 more
+    sales(range(2000), [i % 300 for i in range(2000)]).to_csv(
+        os.path.join(autodw.UPLOAD_DIR, "sales.csv"), index=False)
+    sales(range(2000, 2500), [i % 400 for i in range(500)]).to_csv(
+        os.path.join(autodw.UPLOAD_DIR, "more.csv"), index=False)
+    
+    built = autodw.build_project("sales.csv", {"format": "csv", "normalize": True})
+    assert built["dimension_tables"] == ["dim_product"]
+    
+    appended = autodw.append_partitions(built["project_id"], "more.csv")
+    assert appended["rows"] == 500
+    
+    project_dir = os.path.join(autodw.OUTPUT_DIR, f"project_{built['project_id']}")
+    dim = pd.read_csv(os.path.join(project_dir, "dim_product.csv"))
+    assert len(dim) == 400
+    # Existing members keep their surrogate keys
+    assert dim["product"].head(300).tolist() == [f"p{p}" for p in range(300)]
@@ -0,0 +1,41 @@
+"""Row counts of CSVs streamed through CsvStreamStats on upload and for /files"""
+import io
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+
+def streamed_rows(autodw, data: bytes, chunk_size: int) -> int:
+    stats = autodw.CsvStreamStats()
+    for start in range(0, len(data), chunk_size):
+        stats.feed(data[start:start + chunk_size])
+    return stats.result()[0]
+
+
+@pytest.mark.parametrize("data", [
+    # A literal quote inside an unquoted field does not start a quoted field
+    b"item,size\n" + b"".join(b'pipe %d,5" pipe\n' % i for i in range(1000)),
+    # Trailing blank lines are not records
+    b"a,b\n1,2\n3,4\n\n\n",
+    b"a,b\r\n1,2\r\n\r\n3,4\r\n\r\n",
+    # Quoted newlines, separators and escaped quotes
+    b'a,b\n"multi\nline","x, ""quoted"" y"\n"",""""\n"end"',
+    b'a,b\n"x"y,"z"w"\n1,2\n',
+])
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 1 << 20])
+def test_streamed_row_count_matches_pandas(autodw, data, chunk_size):
+    assert streamed_rows(autodw, data, chunk_size) == len(pd.read_csv(io.BytesIO(data)))
+
+
+def test_upload_and_files_count_literal_quotes_and_skip_blank_lines(autodw):
+    pipes = b"item,size\n" + b"".join(b'pipe %d,5" pipe\n' % i for i in range(1000))
+    blanks = b"a,b\n1,2\n3,4\n\n\n"
+    with TestClient(autodw.app) as client:
+        for name, data in (("pipes.csv", pipes), ("blanks.csv", blanks)):
+            response = client.post("/upload", files={"file": (name, data, "text/csv")})
+            assert response.status_code == 200
+            assert response.json()["rows"] == {"pipes.csv": 1000, "blanks.csv": 2}[name]
+    
+    assert autodw.count_csv_stats("pipes.csv")["rows"] == 1000
+    assert autodw.count_csv_stats("blanks.csv")["rows"] == 2
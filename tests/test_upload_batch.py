@@ -0,0 +1,30 @@
+"""Batch uploads of CSV/PDF files and zip archives"""
+import io
+import json
+import os
+import zipfile
+
+from fastapi.testclient import TestClient
+
+
+def test_zip_members_with_the_same_name_do_not_overwrite_each_other(autodw):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("jan/sales.csv", "month,amount\njan,1\n")
+        zf.writestr("feb/sales.csv", "month,amount\nfeb,2\nfeb,3\n")
+        zf.writestr("feb/returns.csv", "month,amount\nfeb,-1\n")
+    
+    with TestClient(autodw.app) as client:
+        response = client.post("/upload/batch", files=[("files", ("months.zip", archive.getvalue(), "application/zip"))])
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    results = {line["filename"]: line for line in lines if "done" not in line}
+    
+    assert results["sales.csv"]["status"] == "uploaded"
+    assert results["returns.csv"]["status"] == "uploaded"
+    collision = results["months.zip/feb/sales.csv"]
+    assert collision["status"] == "failed" and collision["status_code"] == 409
+    assert "months.zip/jan/sales.csv" in collision["error"]
+    assert lines[-1]["uploaded"] == 2 and lines[-1]["failed"] == 1
+    
+    with open(os.path.join(autodw.UPLOAD_DIR, "sales.csv")) as f:
+        assert f.read() == "month,amount\njan,1\n"
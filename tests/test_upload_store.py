@@ -0,0 +1,19 @@
+"""The content-addressed upload store: names, blobs and their caches"""
+import os
+
+from fastapi.testclient import TestClient
+
+
+def test_pdf_page_cache_is_removed_with_the_last_name_of_its_content(autodw):
+    data = b"month,amount\njan,1\n"
+    with TestClient(autodw.app) as client:
+        for name in ("a.csv", "b.csv"):
+            assert client.post("/upload", files={"file": (name, data, "text/csv")}).status_code == 200
+        # The page cache is keyed by content hash like the blob, whatever the file type
+        cache_dir = autodw.pdf_cache_dir(autodw.file_hash(os.path.join(autodw.UPLOAD_DIR, "a.csv")))
+        os.makedirs(cache_dir)
+        
+        assert client.delete("/files/a.csv").status_code == 200
+        assert os.path.isdir(cache_dir)
+        assert client.delete("/files/b.csv").status_code == 200
+        assert not os.path.exists(cache_dir)